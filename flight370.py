@@ -4,6 +4,22 @@ import random
 import math
 import binascii
 import argparse
+import sys
+import logging
+import bisect
+import heapq
+import json
+import os
+import mmap
+import copy
+import struct
+import tempfile
+import concurrent.futures
+import types
+
+import numpy as np
+
+log = logging.getLogger('flight370')
 
 # Location coordinates
 AUGUSTA_LAT = 33.3699
@@ -18,11 +34,16 @@ ORANGE_LON = -81.030564
 # CPR constants from dump1090.c
 NZ = 15  # Number of geographic latitude zones
 
-def crc24(msg):
+# CRC-24 generator polynomial from dump1090.c
+CRC24_GENERATOR = 0x1FFF409
+
+def crc24_bitwise(msg):
     """
     Calculate CRC-24 for ADS-B messages using the polynomial from dump1090.c
+
+    Reference bit-at-a-time implementation, kept for verification and
+    benchmarking of the table-driven crc24().
     """
-    GENERATOR = 0x1FFF409
     crc = 0
     
     for byte in msg:
@@ -30,17 +51,62 @@ def crc24(msg):
         for _ in range(8):
             crc <<= 1
             if crc & 0x1000000:
-                crc ^= GENERATOR
+                crc ^= CRC24_GENERATOR
     
     return crc & 0xFFFFFF
 
+def _build_crc24_table():
+    """Precompute the CRC-24 remainder of every possible leading byte"""
+    table = []
+    for byte in range(256):
+        crc = byte << 16
+        for _ in range(8):
+            crc <<= 1
+            if crc & 0x1000000:
+                crc ^= CRC24_GENERATOR
+        table.append(crc & 0xFFFFFF)
+    return tuple(table)
+
+CRC24_TABLE = _build_crc24_table()
+
+def crc24(msg, crc=0):
+    """
+    Calculate CRC-24 for ADS-B messages, one byte per table lookup.
+    Gives the same result as crc24_bitwise().
+    
+    The CRC is linear, so crc24(tail, crc24(head)) == crc24(head + tail):
+    pass a cached register value as crc to skip bytes that never change.
+    """
+    table = CRC24_TABLE
+    
+    for byte in msg:
+        crc = ((crc << 8) & 0xFFFFFF) ^ table[(crc >> 16) ^ byte]
+    
+    return crc
+
+def crc24_syndrome(frame):
+    """
+    Return the CRC syndrome of a complete frame (payload followed by its
+    3 parity bytes). A syndrome of 0 means the frame is intact.
+    """
+    if isinstance(frame, str):
+        frame = bytes.fromhex(frame.strip().lstrip('*').rstrip(';'))
+    parity = (frame[-3] << 16) | (frame[-2] << 8) | frame[-1]
+    return crc24(frame[:-3]) ^ parity
+
+def crc24_verify(frame):
+    """Check the parity of a complete frame (bytes or AVR '*HEX;' string)"""
+    return crc24_syndrome(frame) == 0
+
 def floor(x):
     """Integer floor function"""
     return int(math.floor(x))
 
-def cprNL(lat):
+def cprNL_formula(lat):
     """
     NL function from dump1090.c - Calculate the number of longitude zones
+
+    Reference closed-form version, used to build CPR_NL_TABLE.
     """
     if lat == 0:
         return 59
@@ -56,6 +122,40 @@ def cprNL(lat):
     
     return floor(2.0 * math.pi / tmp)
 
+def _build_cprNL_table():
+    """
+    Find the latitudes where NL drops from 59 zones down to 2, like the
+    table in dump1090.c. Each entry is the first float at which
+    cprNL_formula() returns fewer zones, so lookups match it exactly.
+    """
+    a = 1.0 - math.cos(math.pi / (2.0 * NZ))
+    table = []
+    for nl in range(59, 2, -1):
+        approx = math.degrees(math.acos(math.sqrt(a / (1.0 - math.cos(2.0 * math.pi / nl)))))
+        lo, hi = approx - 1e-6, approx + 1e-6
+        # Bisect down to adjacent floats around the transition
+        while True:
+            mid = (lo + hi) / 2
+            if mid == lo or mid == hi:
+                break
+            if cprNL_formula(mid) < nl:
+                hi = mid
+            else:
+                lo = mid
+        table.append(hi)
+    return tuple(table)
+
+CPR_NL_TABLE = _build_cprNL_table()
+
+def cprNL(lat):
+    """
+    NL function from dump1090.c - Calculate the number of longitude zones
+    """
+    lat = abs(lat)
+    if lat > 87:
+        return 1
+    return 59 - bisect.bisect_right(CPR_NL_TABLE, lat)
+
 def cprDlat(cprEncType):
     """Return the size of a latitude zone"""
     return 360.0 / (4 * NZ - cprEncType)
@@ -91,13 +191,18 @@ def encode_cpr_position(lat, lon, is_odd):
     # CPR encode type (0 for even, 1 for odd)
     cprEncType = 1 if is_odd else 0
     
-    # Calculate zone sizes
+    # Calculate latitude zone size
     dlat = cprDlat(cprEncType)
-    dlon = cprDlon(lat, cprEncType)
     
     # Compute latitude index (YZ)
     # Exactly matching dump1090's method
-    lat_cpr = floor(2**17 * ((lat % dlat) / dlat))
+    lat_remainder = lat % dlat
+    lat_cpr = floor(2**17 * (lat_remainder / dlat))
+    
+    # Longitude zones follow the latitude a decoder rebuilds from YZ, so both
+    # ends agree on NL when the aircraft is close to a zone boundary
+    lat_zone = round((lat - lat_remainder) / dlat)
+    dlon = cprDlon(dlat * (lat_zone + lat_cpr / 2**17), cprEncType)
     
     # Compute longitude index (XZ)
     lon_cpr = floor(2**17 * ((lon % dlon) / dlon))
@@ -108,54 +213,119 @@ def encode_cpr_position(lat, lon, is_odd):
     
     return lat_cpr, lon_cpr
 
+def encode_cpr_positions(lats, lons, is_odd):
+    """
+    Batch version of encode_cpr_position() for a whole fleet at once
+    
+    Args:
+        lats: Array of latitudes in degrees
+        lons: Array of longitudes in degrees
+        is_odd: True for odd CPR format, False for even (or a per-aircraft array)
+    
+    Returns:
+        (lat_cpr, lon_cpr) as int64 arrays of 17-bit values, bit-identical
+        to encode_cpr_position()
+    """
+    # Limit latitude to valid range
+    lat = np.clip(np.asarray(lats, dtype=np.float64), -90.0, 90.0)
+    
+    # Normalize longitude to -180..+180 the same way as the scalar loop
+    lon = np.array(lons, dtype=np.float64)
+    while True:
+        low = lon < -180
+        if not low.any():
+            break
+        lon[low] += 360
+    while True:
+        high = lon >= 180
+        if not high.any():
+            break
+        lon[high] -= 360
+    
+    # CPR encode type (0 for even, 1 for odd)
+    cprEncType = np.asarray(is_odd, dtype=np.int64)
+    
+    # Compute latitude index (YZ)
+    dlat = 360.0 / (4 * NZ - cprEncType)
+    lat_remainder = np.remainder(lat, dlat)
+    lat_cpr = np.floor(2**17 * (lat_remainder / dlat)).astype(np.int64)
+    
+    # Longitude zone size, with NL of the decoder-side latitude looked up
+    # from the boundary table
+    lat_zone = np.rint((lat - lat_remainder) / dlat)
+    abs_rlat = np.abs(dlat * (lat_zone + lat_cpr / 2**17))
+    nl = 59 - np.searchsorted(CPR_NL_TABLE, abs_rlat, side='right')
+    nl = np.where(abs_rlat > 87, 1, nl)
+    dlon = 360.0 / np.maximum(1, nl - cprEncType)
+    
+    # Compute longitude index (XZ)
+    lon_cpr = np.floor(2**17 * (np.remainder(lon, dlon) / dlon)).astype(np.int64)
+    
+    # Ensure 17-bit values
+    lat_cpr &= 0x1FFFF
+    lon_cpr &= 0x1FFFF
+    
+    return lat_cpr, lon_cpr
+
 def encode_altitude(altitude_ft):
     """
     Encode altitude following dump1090.c's decoding logic
+    
+    Returns the 12-bit AC field with Q=1 (25 ft steps): N = (altitude + 1000) / 25,
+    split around the Q bit (0x010) as N's high 7 bits and low 4 bits.
     """
-    # Round to nearest 25ft increment
-    altitude_ft = round(altitude_ft / 25.0) * 25
+    # Round to nearest 25ft increment, offset by the -1000ft origin
+    n = int(round((altitude_ft + 1000) / 25.0))
     
-    # Calculate N value (Gillham code with Q=1)
-    n = int(altitude_ft / 25)
+    # N is 11 bits wide
+    n = max(0, min(0x7FF, n))
     
     # Set Q bit (1 for 25ft resolution)
     q_bit = 1
     
     # Construct 12-bit altitude field
-    altitude_encoded = (n & 0x7FF) | (q_bit << 11)
+    altitude_encoded = ((n & 0x7F0) << 1) | (q_bit << 4) | (n & 0x00F)
     
     return altitude_encoded
 
-def create_airborne_position_message(icao_hex, lat, lon, altitude, is_odd):
-    """
-    Generate a complete ADS-B message following dump1090.c's formats
+def format_avr(frame):
+    """Format a raw frame as an AVR ASCII message ('*HEX;')"""
+    hex_msg = binascii.hexlify(frame).decode('ascii').upper()
+    return f"*{hex_msg};"
+
+def write_crc(msg, payload=None, state=0):
     """
-    # Convert ICAO to integer
-    if isinstance(icao_hex, str):
-        icao_int = int(icao_hex, 16)
-    else:
-        icao_int = icao_hex
-    
-    # Create message buffer (11 bytes before CRC)
-    msg = bytearray(11)
-    
-    # DF 17 (ADS-B message) with CA=5
-    msg[0] = 0x8D
-    
-    # ICAO address (24 bits)
-    msg[1] = (icao_int >> 16) & 0xFF
-    msg[2] = (icao_int >> 8) & 0xFF
-    msg[3] = icao_int & 0xFF
-    
-    # TC 11 (airborne position) with surveillance status 0
-    msg[4] = 0x58
+    Compute the CRC-24 of the first 11 bytes of a 14-byte frame buffer and
+    store it in the last 3
     
+    Args:
+        msg: Frame buffer
+        payload: Reusable view of the bytes still to be CRCed (default: all 11)
+        state: CRC register after the bytes before payload, e.g. a cached header
+    """
+    if payload is None:
+        payload = memoryview(msg)[:11]
+    crc = crc24(payload, state)
+    msg[11] = (crc >> 16) & 0xFF
+    msg[12] = (crc >> 8) & 0xFF
+    msg[13] = crc & 0xFF
+
+def frame_header(icao):
+    """Bytes 0-3 of a frame: DF 17 with CA=5, then the 24-bit ICAO address, given as hex or an integer"""
+    if isinstance(icao, str):
+        icao = int(icao, 16)
+    return bytes((0x8D, (icao >> 16) & 0xFF, (icao >> 8) & 0xFF, icao & 0xFF))
+
+def pack_airborne_position(msg, lat, lon, altitude, is_odd):
+    """Pack altitude, CPR format and position into bytes 5-10 of a TC 11 frame buffer"""
+    lat_cpr, lon_cpr = encode_cpr_position(lat, lon, is_odd)
+    pack_airborne_cpr(msg, lat_cpr, lon_cpr, altitude, is_odd)
+
+def pack_airborne_cpr(msg, lat_cpr, lon_cpr, altitude, is_odd):
+    """pack_airborne_position() of a position already CPR-encoded, e.g. by encode_cpr_positions()"""
     # Encode altitude
     alt_encoded = encode_altitude(altitude)
     
-    # Encode position
-    lat_cpr, lon_cpr = encode_cpr_position(lat, lon, is_odd)
-    
     # F flag (0 for even, 1 for odd)
     f_flag = 1 if is_odd else 0
     
@@ -166,20 +336,73 @@ def create_airborne_position_message(icao_hex, lat, lon, altitude, is_odd):
     msg[8] = ((lat_cpr & 0x7F) << 1) | ((lon_cpr >> 16) & 0x01)
     msg[9] = (lon_cpr >> 8) & 0xFF
     msg[10] = lon_cpr & 0xFF
+
+def encode_airborne_position(icao_hex, lat, lon, altitude, is_odd):
+    """
+    Generate a complete raw 14-byte ADS-B frame following dump1090.c's formats
+    """
+    # Create message buffer (11 bytes plus 3 for the CRC) behind the DF 17 header
+    msg = bytearray(frame_header(icao_hex) + bytes(10))
     
-    # Calculate and append CRC
-    crc = crc24(msg)
-    msg.append((crc >> 16) & 0xFF)
-    msg.append((crc >> 8) & 0xFF)
-    msg.append(crc & 0xFF)
+    # TC 11 (airborne position) with surveillance status 0
+    msg[4] = 0x58
     
-    # Format in Beast/AVR ASCII format
-    hex_msg = binascii.hexlify(msg).decode('ascii').upper()
-    return f"*{hex_msg};"
+    # Altitude, CPR position and CRC
+    pack_airborne_position(msg, lat, lon, altitude, is_odd)
+    write_crc(msg)
+    
+    return bytes(msg)
 
-def create_velocity_message(icao_hex, speed_knots, heading, vertical_rate):
+def create_airborne_position_message(icao_hex, lat, lon, altitude, is_odd):
+    """
+    Generate a complete ADS-B message following dump1090.c's formats
+    """
+    return format_avr(encode_airborne_position(icao_hex, lat, lon, altitude, is_odd))
+
+def velocity_fields(speed_knots, heading, vertical_rate):
+    """Return the (ew_sign, ew_value, ns_sign, ns_value, vr_sign, vr_value) fields of a TC 19 frame"""
+    # Convert heading and speed to East-West and North-South components
+    heading_rad = math.radians(heading)
+    east_west = speed_knots * math.sin(heading_rad)
+    north_south = speed_knots * math.cos(heading_rad)
+    
+    # Encode East-West velocity (value is knots + 1; 0 means unavailable)
+    ew_sign = 0 if east_west >= 0 else 1
+    ew_value = min(1023, int(round(abs(east_west))) + 1)
+    
+    # Encode North-South velocity
+    ns_sign = 0 if north_south >= 0 else 1
+    ns_value = min(1023, int(round(abs(north_south))) + 1)
+    
+    # Encode vertical rate (in 64 feet per minute units, plus 1)
+    vr_sign = 0 if vertical_rate >= 0 else 1
+    vr_value = min(511, int(round(abs(vertical_rate) / 64)) + 1)
+    
+    return ew_sign, ew_value, ns_sign, ns_value, vr_sign, vr_value
+
+def pack_velocity_fields(msg, fields):
+    """Pack velocity_fields() into bytes 5-10 of a TC 19 frame buffer"""
+    ew_sign, ew_value, ns_sign, ns_value, vr_sign, vr_value = fields
+    
+    # Pack into the message
+    # Intent change=0, IFR=1, NACv=0, then the East-West sign and top 2 bits
+    msg[5] = 0x40 | (ew_sign << 2) | ((ew_value >> 8) & 0x03)
+    msg[6] = ew_value & 0xFF
+    msg[7] = (ns_sign << 7) | ((ns_value >> 3) & 0x7F)
+    # Vertical rate source=0 (GNSS)
+    msg[8] = ((ns_value & 0x07) << 5) | (vr_sign << 3) | ((vr_value >> 6) & 0x07)
+    msg[9] = (vr_value & 0x3F) << 2
+    
+    # GNSS/baro altitude difference not available
+    msg[10] = 0x00
+
+def pack_velocity(msg, speed_knots, heading, vertical_rate):
+    """Pack ground speed components and vertical rate into bytes 5-10 of a TC 19 frame buffer"""
+    pack_velocity_fields(msg, velocity_fields(speed_knots, heading, vertical_rate))
+
+def encode_velocity(icao_hex, speed_knots, heading, vertical_rate):
     """
-    Create an airborne velocity message (Type Code 19)
+    Create a raw 14-byte airborne velocity frame (Type Code 19)
     This contains the aircraft's heading which will orient the icon correctly
     
     Args:
@@ -189,134 +412,381 @@ def create_velocity_message(icao_hex, speed_knots, heading, vertical_rate):
         vertical_rate: Vertical rate in feet per minute
         
     Returns:
-        Complete ADS-B velocity message
+        Complete ADS-B velocity frame as bytes
     """
-    # Convert ICAO to integer
-    if isinstance(icao_hex, str):
-        icao_int = int(icao_hex, 16)
-    else:
-        icao_int = icao_hex
-    
-    # Create message buffer (11 bytes before CRC)
-    msg = bytearray(11)
-    
-    # DF 17 (ADS-B message) with CA=5
-    msg[0] = 0x8D
-    
-    # ICAO address (24 bits)
-    msg[1] = (icao_int >> 16) & 0xFF
-    msg[2] = (icao_int >> 8) & 0xFF
-    msg[3] = icao_int & 0xFF
+    # Create message buffer (11 bytes plus 3 for the CRC) behind the DF 17 header
+    msg = bytearray(frame_header(icao_hex) + bytes(10))
     
     # TC 19 (airborne velocity) subtype 1 (ground speed)
     msg[4] = 0x99  # TC=19, subtype=1
     
-    # Convert heading and speed to East-West and North-South components
-    heading_rad = math.radians(heading)
-    east_west = speed_knots * math.sin(heading_rad)
-    north_south = speed_knots * math.cos(heading_rad)
+    # Velocity components, vertical rate and CRC
+    pack_velocity(msg, speed_knots, heading, vertical_rate)
+    write_crc(msg)
     
-    # Encode East-West velocity
-    ew_sign = 0 if east_west >= 0 else 1
-    ew_value = min(1023, int(abs(east_west)))
+    return bytes(msg)
+
+def create_velocity_message(icao_hex, speed_knots, heading, vertical_rate):
+    """
+    Create an airborne velocity message (Type Code 19) in AVR format
+    """
+    return format_avr(encode_velocity(icao_hex, speed_knots, heading, vertical_rate))
+
+# 6-bit character set of identification (TC 1-4) frames; '#' marks unused codes
+AIS_CHARSET = "#ABCDEFGHIJKLMNOPQRSTUVWXYZ##### ###############0123456789######"
+AIS_CODES = {char: code for code, char in enumerate(AIS_CHARSET) if char != '#'}
+
+# Identification byte 4 (type code << 3 | emitter category) by aircraft category
+EMITTER_CATEGORIES = {
+    'light': (4 << 3) | 1,
+    'large': (4 << 3) | 3,
+    'heavy': (4 << 3) | 5,
+    'high_performance': (4 << 3) | 6,
+    'rotorcraft': (4 << 3) | 7,
+    'glider': (3 << 3) | 1,
+    'ultralight': (3 << 3) | 4,
+}
+
+def encode_callsign(callsign):
+    """Pack a callsign of up to 8 characters into a 48-bit integer of AIS codes, space padded"""
+    bits = 0
+    for char in callsign.upper().ljust(8)[:8]:
+        code = AIS_CODES.get(char)
+        if code is None:
+            raise ValueError(f"Character {char!r} is not in the AIS character set")
+        bits = (bits << 6) | code
+    return bits
+
+def pack_identification(msg, callsign):
+    """Pack the callsign into bytes 5-10 of an identification frame buffer"""
+    msg[5:11] = encode_callsign(callsign).to_bytes(6, 'big')
+
+def encode_identification(icao_hex, callsign, category=EMITTER_CATEGORIES['large']):
+    """
+    Create a raw 14-byte aircraft identification frame (Type Code 1-4)
     
-    # Encode North-South velocity
-    ns_sign = 0 if north_south >= 0 else 1
-    ns_value = min(1023, int(abs(north_south)))
+    Args:
+        icao_hex: Aircraft ICAO address
+        callsign: Flight number or registration, up to 8 characters
+        category: Type code and emitter category byte from EMITTER_CATEGORIES
     
-    # Encode vertical rate (in 64 feet per minute units)
-    vr_sign = 0 if vertical_rate >= 0 else 1
-    vr_value = min(511, int(abs(vertical_rate) / 64))
+    Returns:
+        Complete ADS-B identification frame as bytes
+    """
+    # Create message buffer (11 bytes plus 3 for the CRC) behind the DF 17 header
+    msg = bytearray(frame_header(icao_hex) + bytes(10))
     
-    # Pack into the message
-    msg[5] = 0x01  # Intent change=0, IFR=1, NACv=0
+    # TC 1-4 and emitter category
+    msg[4] = category
     
-    msg[6] = ((ew_sign << 7) | ((ew_value >> 3) & 0x7F))
-    msg[7] = ((ew_value & 0x07) << 5) | ((ns_sign << 4) | ((ns_value >> 6) & 0x0F))
-    msg[8] = ((ns_value & 0x3F) << 2) | ((vr_sign << 1) | (vr_value >> 8))
-    msg[9] = (vr_value & 0xFF)
+    # Callsign and CRC
+    pack_identification(msg, callsign)
+    write_crc(msg)
     
-    # Reserved and source bits
-    msg[10] = 0x00
+    return bytes(msg)
+
+def create_identification_message(icao_hex, callsign, category=EMITTER_CATEGORIES['large']):
+    """
+    Create an aircraft identification message (Type Code 1-4) in AVR format
+    """
+    return format_avr(encode_identification(icao_hex, callsign, category))
+
+# Beast binary framing
+BEAST_ESCAPE = 0x1A
+BEAST_TYPE_LONG = 0x33  # '3': 14-byte Mode S frame
+BEAST_CLOCK_HZ = 12000000  # 12 MHz MLAT timestamp counter
+BEAST_SIGNAL_LEVEL = 0xC0
+
+def format_beast(frame, timestamp, signal=BEAST_SIGNAL_LEVEL):
+    """
+    Format a raw 14-byte frame as a Beast binary message
     
-    # Calculate and append CRC
-    crc = crc24(msg)
-    msg.append((crc >> 16) & 0xFF)
-    msg.append((crc >> 8) & 0xFF)
-    msg.append(crc & 0xFF)
+    Args:
+        frame: Raw frame bytes
+        timestamp: Emission time in seconds on the simulator clock
+        signal: Signal level byte (0-255)
     
-    # Format in Beast/AVR ASCII format
-    hex_msg = binascii.hexlify(msg).decode('ascii').upper()
-    return f"*{hex_msg};"
+    Returns:
+        Escaped Beast message: 0x1a '3', 48-bit 12 MHz timestamp, signal, frame
+    """
+    ticks = int(timestamp * BEAST_CLOCK_HZ) & 0xFFFFFFFFFFFF
+    body = ticks.to_bytes(6, 'big') + bytes((signal,)) + frame
+    return bytes((BEAST_ESCAPE, BEAST_TYPE_LONG)) + body.replace(b'\x1a', b'\x1a\x1a')
+
+def format_avr_line(frame, timestamp):
+    """AVR output: one '*HEX;' line per frame, without a timestamp"""
+    return b'*%s;\n' % binascii.hexlify(frame).upper()
+
+def format_avr_mlat_line(frame, timestamp):
+    """AVR MLAT output: one '@TIMESTAMPHEX;' line per frame with the 12 MHz timestamp"""
+    ticks = int(timestamp * BEAST_CLOCK_HZ) & 0xFFFFFFFFFFFF
+    hex_msg = binascii.hexlify(frame).decode('ascii').upper()
+    return f"@{ticks:012X}{hex_msg};\n".encode('ascii')
+
+# Output formats by name: each turns (raw frame, timestamp) into bytes for the wire
+FRAME_FORMATS = {
+    'avr': format_avr_line,
+    'avr-mlat': format_avr_mlat_line,
+    'beast': format_beast,
+}
+
+# dump1090 network input port for each output format
+DEFAULT_PORTS = {
+    'avr': 30001,
+    'avr-mlat': 30001,
+    'beast': 30004,
+}
+
+# Callsign prefixes for generated airline and military flights
+AIRLINE_PREFIXES = ('AAL', 'DAL', 'UAL', 'SWA', 'JBU', 'ASA', 'FFT', 'RPA', 'EDV', 'ENY', 'FDX', 'UPS')
+MILITARY_PREFIXES = ('RCH', 'EVAC', 'TOPCAT', 'DUKE', 'HAWK', 'VIPER', 'PAT', 'SPAR')
 
-def generate_aircraft(args):
-    """Generate a realistic aircraft with ICAO address and fixed heading"""
-    icao = f"{random.randint(0, 0xFFFFFF):06X}"
+def generate_identification(rng, aircraft_type):
+    """Return a (callsign, category byte) pair for a 'commercial', 'private' or 'military' aircraft"""
+    if aircraft_type == 'commercial':
+        callsign = f"{rng.choice(AIRLINE_PREFIXES)}{rng.randint(1, 9999)}"
+        category = 'heavy' if rng.random() < 0.3 else 'large'
+    elif aircraft_type == 'private':
+        # US civil registration: N, 1-5 digits, sometimes a trailing letter
+        callsign = f"N{rng.randint(1, 99999)}"
+        if len(callsign) < 6 and rng.random() < 0.5:
+            callsign += rng.choice("ABCDEFGHJKLMNPQRSTUVWXYZ")
+        category = rng.choices(('light', 'rotorcraft', 'glider', 'ultralight'), (85, 9, 3, 3))[0]
+    else:
+        callsign = f"{rng.choice(MILITARY_PREFIXES)}{rng.randint(1, 99):02d}"
+        category = rng.choices(('high_performance', 'large', 'rotorcraft'), (60, 25, 15))[0]
+    return callsign, EMITTER_CATEGORIES[category]
+
+def draw_icao(rng=random, fleet=None):
+    """
+    Random ICAO address as a 6-digit hex string, from the fleet's share of
+    the address space, redrawn until no aircraft in fleet has it
+    """
+    shard, shards = (0, 1) if fleet is None else fleet.icao_space
+    while True:
+        icao = f"{rng.randint(0, (0xFFFFFF - shard) // shards) * shards + shard:06X}"
+        if fleet is None or fleet.index_of(int(icao, 16)) is None:
+            return icao
+
+def generate_aircraft(args, rng=random, now=None, fleet=None):
+    """
+    Generate a realistic aircraft with ICAO address, callsign and initial heading
+    
+    args supplies the center (lat, long), e.g. a Coverage, and optionally
+    a motion mix ({model name: weight}) to draw the aircraft's motion model
+    from; without one it flies straight. All randomness is drawn from rng,
+    so a seeded rng.Random gives a repeatable aircraft; now is its
+    last_update time (default: wall clock). The ICAO address is unique
+    within fleet, which keys its schedule and frame templates on it.
+    """
+    icao = draw_icao(rng, fleet)
     
     # Generate a random heading (0-359 degrees)
-    heading = random.randint(0, 359)
+    heading = rng.randint(0, 359)
     
     # Generate a random offset from the center point
-    offset_distance = random.uniform(0.1, 0.5)  # Distance in degrees
-    offset_angle = random.uniform(0, 2 * math.pi)  # Random angle in radians
+    offset_distance = rng.uniform(0.1, 0.5)  # Distance in degrees
+    offset_angle = rng.uniform(0, 2 * math.pi)  # Random angle in radians
     
     # Calculate position offset from the center
     offset_lat = offset_distance * math.cos(offset_angle)
     offset_lon = offset_distance * math.sin(offset_angle)
     
     # Altitude based on aircraft type
-    if random.random() < 0.3:  # 30% commercial
-        altitude = random.choice([25000, 30000, 35000, 38000])
-        speed = random.randint(400, 550)
-        climb_rate = random.choice([-500, -300, 0, 300, 500])
-    elif random.random() < 0.6:  # 30% private
-        altitude = random.choice([3500, 7500, 10000, 15000])
-        speed = random.randint(150, 350)
-        climb_rate = random.choice([-300, -100, 0, 100, 300])
+    if rng.random() < 0.3:  # 30% commercial
+        altitude = rng.choice([25000, 30000, 35000, 38000])
+        speed = rng.randint(400, 550)
+        climb_rate = rng.choice([-500, -300, 0, 300, 500])
+        aircraft_type = 'commercial'
+    elif rng.random() < 0.6:  # 30% private
+        altitude = rng.choice([3500, 7500, 10000, 15000])
+        speed = rng.randint(150, 350)
+        climb_rate = rng.choice([-300, -100, 0, 100, 300])
+        aircraft_type = 'private'
     else:  # 40% military/other
-        altitude = random.choice([5000, 15000, 25000, 35000])
-        speed = random.randint(300, 600)
-        climb_rate = random.choice([-800, -400, 0, 400, 800])
+        altitude = rng.choice([5000, 15000, 25000, 35000])
+        speed = rng.randint(300, 600)
+        climb_rate = rng.choice([-800, -400, 0, 400, 800])
+        aircraft_type = 'military'
+    
+    callsign, category = generate_identification(rng, aircraft_type)
     
     # Create the aircraft object
-    return {
+    aircraft = {
         'icao': icao,
         'alt': altitude,
         'speed': speed,
-        'heading': heading,  # Fixed heading that won't change
+        'heading': heading,
         'climb_rate': climb_rate,
+        'callsign': callsign,
+        'category': category,
         'lat': args.lat + offset_lat,
         'lon': args.long + offset_lon,
-        'last_update': time.time(),
+        'last_update': time.time() if now is None else now,
         'odd_frame': False,
     }
+    
+    motion = getattr(args, 'motion', None)
+    if motion:
+        model = MOTION_MODELS[MOTION_MODEL_IDS[rng.choices(list(motion), list(motion.values()))[0]]]
+        aircraft['model'] = model.id
+        model.setup(aircraft, rng)
+    return aircraft
 
-def update_aircraft_position(aircraft, elapsed):
+# WGS84 ellipsoid
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = WGS84_A * (1 - WGS84_F)
+
+# Metres travelled per knot per second
+METRES_PER_KNOT_SECOND = 1852.0 / 3600.0
+
+# Fixed-point iterations of Vincenty's direct formula; three keep end points
+# within 0.1 mm of geographiclib's WGS84 solution out to 10,000 km
+VINCENTY_ITERATIONS = 3
+
+# Fleets with at most this many aircraft due in a tick are evaluated one by
+# one with SCALAR_MATH, below the fixed cost of a round of NumPy calls
+SCALAR_EVALUATION_LIMIT = 8
+
+# The subset of NumPy's math the geodesic functions use, for plain floats
+SCALAR_MATH = types.SimpleNamespace(sin=math.sin, cos=math.cos, tan=math.tan, sqrt=math.sqrt, arctan2=math.atan2,
+                                    radians=math.radians, degrees=math.degrees)
+
+# Per-segment constants of geodesic_evaluate(), in the order geodesic_constants() returns them
+GEODESIC_FIELDS = ('sin_u1', 'cos_u1', 'two_sigma1', 'sin_alpha', 'cos2_alpha',
+                   'vincenty_a', 'vincenty_b', 'vincenty_c', 'sin_azimuth', 'cos_azimuth')
+
+def geodesic_constants(lat, azimuth, xp=np):
     """
-    Update aircraft position based on heading - ensuring straight line movement
+    Distance-independent terms of Vincenty's direct formula for geodesics
+    leaving lat (degrees) at azimuth (degrees clockwise from north)
+    
+    Works on arrays with xp=np, or floats with xp=SCALAR_MATH; returns a
+    tuple in GEODESIC_FIELDS order.
     """
-    # Convert speed from knots to degrees per second
-    # 1 knot ≈ 0.0003 nautical miles per second
-    # 1 nautical mile ≈ 0.0166 degrees of latitude at equator
-    # This gives approximately 0.000008 degrees per second per knot
-    speed_deg_per_sec = aircraft['speed'] * 0.000008 * elapsed
+    azimuth_rad = xp.radians(azimuth)
+    sin_azimuth = xp.sin(azimuth_rad)
+    cos_azimuth = xp.cos(azimuth_rad)
     
-    # Convert heading to radians (0° = North, 90° = East)
-    heading_rad = math.radians(90 - aircraft['heading'])  # Adjust for 0° = East in math functions
+    # Reduced latitude of the start point
+    tan_u1 = (1 - WGS84_F) * xp.tan(xp.radians(lat))
+    cos_u1 = 1 / xp.sqrt(1 + tan_u1 * tan_u1)
+    sin_u1 = tan_u1 * cos_u1
     
-    # Calculate position change
-    # For correct straight line movement, we need to:
-    # - Move northward by speed * cos(heading)
-    # - Move eastward by speed * sin(heading)
-    lat_change = speed_deg_per_sec * math.cos(heading_rad)
+    # Twice the arc from the equator crossing to the start, and the geodesic's equatorial azimuth
+    two_sigma1 = 2 * xp.arctan2(tan_u1, cos_azimuth)
+    sin_alpha = cos_u1 * sin_azimuth
+    cos2_alpha = 1 - sin_alpha * sin_alpha
     
-    # Longitude change depends on latitude (circles of longitude get smaller near poles)
-    # cos(latitude) compensates for this
-    lon_change = speed_deg_per_sec * math.sin(heading_rad) / math.cos(math.radians(aircraft['lat']))
+    u2 = cos2_alpha * (WGS84_A * WGS84_A - WGS84_B * WGS84_B) / (WGS84_B * WGS84_B)
+    vincenty_a = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+    vincenty_b = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+    vincenty_c = WGS84_F / 16 * cos2_alpha * (4 + WGS84_F * (4 - 3 * cos2_alpha))
+    return (sin_u1, cos_u1, two_sigma1, sin_alpha, cos2_alpha,
+            vincenty_a, vincenty_b, vincenty_c, sin_azimuth, cos_azimuth)
+
+def geodesic_evaluate(constants, lon, distance, xp=np):
+    """
+    End point of Vincenty's direct problem from precomputed constants
+    
+    Args:
+        constants: Tuple from geodesic_constants() for the start latitude and azimuth
+        lon: Start longitude in degrees
+        distance: Metres along the geodesic
+        xp: np for arrays, SCALAR_MATH for floats
     
-    # Update position
-    aircraft['lat'] += lat_change
-    aircraft['lon'] += lon_change
+    Returns:
+        (lat, lon, azimuth) in degrees at the end point; azimuth is the
+        forward track there
+    """
+    (sin_u1, cos_u1, two_sigma1, sin_alpha, cos2_alpha,
+     vincenty_a, vincenty_b, vincenty_c, sin_azimuth, cos_azimuth) = constants
+    
+    # Solve for the arc length sigma on the auxiliary sphere
+    sigma0 = distance / (WGS84_B * vincenty_a)
+    sigma = sigma0
+    for _ in range(VINCENTY_ITERATIONS):
+        cos_2sigma_m = xp.cos(two_sigma1 + sigma)
+        sin_sigma = xp.sin(sigma)
+        cos_sigma = xp.cos(sigma)
+        delta_sigma = vincenty_b * sin_sigma * (cos_2sigma_m + vincenty_b / 4 * (
+            cos_sigma * (-1 + 2 * cos_2sigma_m * cos_2sigma_m)
+            - vincenty_b / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma * sin_sigma) * (-3 + 4 * cos_2sigma_m * cos_2sigma_m)))
+        sigma = sigma0 + delta_sigma
+    cos_2sigma_m = xp.cos(two_sigma1 + sigma)
+    sin_sigma = xp.sin(sigma)
+    cos_sigma = xp.cos(sigma)
+    
+    x = sin_u1 * sin_sigma - cos_u1 * cos_sigma * cos_azimuth
+    lat = xp.arctan2(sin_u1 * cos_sigma + cos_u1 * sin_sigma * cos_azimuth,
+                     (1 - WGS84_F) * xp.sqrt(sin_alpha * sin_alpha + x * x))
+    lam = xp.arctan2(sin_sigma * sin_azimuth, cos_u1 * cos_sigma - sin_u1 * sin_sigma * cos_azimuth)
+    dlon = lam - (1 - vincenty_c) * WGS84_F * sin_alpha * (
+        sigma + vincenty_c * sin_sigma * (cos_2sigma_m + vincenty_c * cos_sigma * (-1 + 2 * cos_2sigma_m * cos_2sigma_m)))
+    azimuth = xp.arctan2(sin_alpha, -x)
+    return xp.degrees(lat), lon + xp.degrees(dlon), xp.degrees(azimuth) % 360.0
+
+def geodesic_direct(lat, lon, azimuth, distance, xp=np):
+    """(lat, lon, azimuth) after distance metres along the WGS84 geodesic from lat, lon at azimuth"""
+    return geodesic_evaluate(geodesic_constants(lat, azimuth, xp), lon, distance, xp)
+
+def geodesic_inverse(lat1, lon1, lat2, lon2):
+    """
+    Length in metres and forward azimuths at both ends of the WGS84 geodesic
+    between two points, by Vincenty's inverse formula on plain floats
+    
+    Raises ValueError for nearly antipodal points, where it does not converge.
+    """
+    dlon = math.radians(lon2 - lon1)
+    u1 = math.atan((1 - WGS84_F) * math.tan(math.radians(lat1)))
+    u2 = math.atan((1 - WGS84_F) * math.tan(math.radians(lat2)))
+    sin_u1, cos_u1 = math.sin(u1), math.cos(u1)
+    sin_u2, cos_u2 = math.sin(u2), math.cos(u2)
+    
+    lam = dlon
+    for _ in range(200):
+        sin_lam, cos_lam = math.sin(lam), math.cos(lam)
+        sin_sigma = math.hypot(cos_u2 * sin_lam, cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lam)
+        if sin_sigma == 0:
+            return 0.0, 0.0, 0.0
+        cos_sigma = sin_u1 * sin_u2 + cos_u1 * cos_u2 * cos_lam
+        sigma = math.atan2(sin_sigma, cos_sigma)
+        sin_alpha = cos_u1 * cos_u2 * sin_lam / sin_sigma
+        cos2_alpha = 1 - sin_alpha * sin_alpha
+        # Along the equator cos2_alpha is 0 and the cos(2 sigma_m) term drops out
+        cos_2sigma_m = cos_sigma - 2 * sin_u1 * sin_u2 / cos2_alpha if cos2_alpha else 0.0
+        c = WGS84_F / 16 * cos2_alpha * (4 + WGS84_F * (4 - 3 * cos2_alpha))
+        previous = lam
+        lam = dlon + (1 - c) * WGS84_F * sin_alpha * (
+            sigma + c * sin_sigma * (cos_2sigma_m + c * cos_sigma * (-1 + 2 * cos_2sigma_m * cos_2sigma_m)))
+        if abs(lam - previous) < 1e-12:
+            break
+    else:
+        raise ValueError(f"geodesic between {lat1}, {lon1} and {lat2}, {lon2} did not converge")
+    
+    u_2 = cos2_alpha * (WGS84_A * WGS84_A - WGS84_B * WGS84_B) / (WGS84_B * WGS84_B)
+    vincenty_a = 1 + u_2 / 16384 * (4096 + u_2 * (-768 + u_2 * (320 - 175 * u_2)))
+    vincenty_b = u_2 / 1024 * (256 + u_2 * (-128 + u_2 * (74 - 47 * u_2)))
+    delta_sigma = vincenty_b * sin_sigma * (cos_2sigma_m + vincenty_b / 4 * (
+        cos_sigma * (-1 + 2 * cos_2sigma_m * cos_2sigma_m)
+        - vincenty_b / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma * sin_sigma) * (-3 + 4 * cos_2sigma_m * cos_2sigma_m)))
+    distance = WGS84_B * vincenty_a * (sigma - delta_sigma)
+    
+    azimuth1 = math.atan2(cos_u2 * sin_lam, cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lam)
+    azimuth2 = math.atan2(cos_u1 * sin_lam, -sin_u1 * cos_u2 + cos_u1 * sin_u2 * cos_lam)
+    return distance, math.degrees(azimuth1) % 360.0, math.degrees(azimuth2) % 360.0
+
+def update_aircraft_position(aircraft, elapsed):
+    """
+    Move an aircraft dict elapsed seconds along the WGS84 geodesic it is
+    flying; its heading becomes the track at the new position
+    """
+    distance = aircraft['speed'] * METRES_PER_KNOT_SECOND * elapsed
+    lat, lon, heading = geodesic_direct(aircraft['lat'], aircraft['lon'], aircraft['heading'], distance, SCALAR_MATH)
+    aircraft['lat'] = float(lat)
+    aircraft['lon'] = float(lon)
+    aircraft['heading'] = float(heading)
     
     # Update altitude based on climb rate
     aircraft['alt'] += (aircraft['climb_rate'] / 60.0) * elapsed
@@ -329,97 +799,1747 @@ def update_aircraft_position(aircraft, elapsed):
     
     return aircraft
 
-def send_position_reports(aircraft_list, host='localhost', port=30001):
-    """Send position reports for aircraft to dump1090"""
+# Per-aircraft fields kept by Fleet, one contiguous array each. lat0, lon0,
+# alt0, heading0 and t0 start the aircraft's current trajectory segment;
+# lat, lon, alt and heading (the current track) are its state evaluated at
+# last_update by the MOTION_MODELS entry in model. Each motion model adds
+# the fields it needs.
+FLEET_FIELDS = (
+    ('icao', np.uint32),
+    ('lat', np.float64),
+    ('lon', np.float64),
+    ('alt', np.float64),
+    ('speed', np.float32),
+    ('heading', np.float32),
+    ('climb_rate', np.float32),
+    ('last_update', np.float64),
+    ('lat0', np.float64),
+    ('lon0', np.float64),
+    ('alt0', np.float64),
+    ('heading0', np.float64),
+    ('t0', np.float64),
+    ('odd_frame', np.bool_),
+    ('callsign', 'S8'),
+    ('category', np.uint8),
+    ('region', np.uint16),
+    ('model', np.uint8),
+)
+
+# Fleet fields that start a trajectory segment, and the state each defaults to
+SEGMENT_START = {'lat0': 'lat', 'lon0': 'lon', 'alt0': 'alt', 'heading0': 'heading', 't0': 'last_update'}
+
+# Fleet fields that aircraft dicts may leave out: generated aircraft belong
+# to region 0 and fly straight (model 0)
+FIELD_DEFAULTS = {'region': 0, 'model': 0}
+
+class Fleet:
+    """
+    Structure-of-arrays state for every simulated aircraft
+    
+    Each field in FLEET_FIELDS, and of each motion model once an aircraft
+    flies it, is a typed array; fleet.lat, fleet.alt etc. are views over the live aircraft
+    and can be read or written in place. The GEODESIC_FIELDS of each segment
+    start are cached alongside, so ticks never repeat the trig that only
+    depends on the start point and heading. update() advances each motion
+    model's aircraft with one call to it, timed into motion_stats; a fleet
+    flying one model (usually all straight) skips the grouping. plans are
+    the FlightPlans flown by aircraft with the 'plan' model. icao_space is
+    (shard, shards): addresses drawn for the fleet are those equal to shard
+    modulo shards, so the fleets of parallel workers never share one.
+    """
+    def __init__(self, capacity=64, plans=None, icao_space=(0, 1)):
+        self.size = 0
+        self.plans = plans
+        self.icao_space = icao_space
+        self.capacity = max(1, capacity)
+        self.motion_stats = MotionStats()
+        self._fields = FLEET_FIELDS
+        self._defaults = dict(FIELD_DEFAULTS)
+        self._arrays = {name: np.zeros(self.capacity, dtype=dtype) for name, dtype in self._fields}
+        self._arrays.update((name, np.zeros(self.capacity)) for name in GEODESIC_FIELDS)
+        self._allocated = set()
+        self._index = {}
+        self._models = None
+        self._rebind()
+    
+    def _allocate(self, model_id):
+        """Add the field arrays of a motion model, filled with its defaults, when its first aircraft arrives"""
+        model = MOTION_MODELS[model_id]
+        self._allocated.add(model_id)
+        self._fields += tuple((name, dtype) for name, dtype, _ in model.fields)
+        for name, dtype, default in model.fields:
+            self._defaults[name] = default
+            self._arrays[name] = np.full(self.capacity, default, dtype=dtype)
+        self._rebind()
+    
+    def _rebind(self):
+        """Point the public field views at the live part of each array"""
+        for name, array in self._arrays.items():
+            setattr(self, name, array[:self.size])
+    
+    def _grow(self):
+        """Double the capacity of every field array"""
+        self.capacity *= 2
+        for name, array in self._arrays.items():
+            grown = np.zeros(self.capacity, dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            self._arrays[name] = grown
+    
+    def __len__(self):
+        return self.size
+    
+    @property
+    def nbytes_per_aircraft(self):
+        """Bytes of state stored per aircraft"""
+        return sum(array.itemsize for array in self._arrays.values())
+    
+    def models(self):
+        """Ids of the motion models flown by at least one aircraft, cached until one is removed"""
+        if self._models is None:
+            self._models = np.flatnonzero(np.bincount(self.model, minlength=1)).tolist()
+        return self._models
+    
+    def set(self, index, aircraft):
+        """Overwrite slot index with an aircraft dict from generate_aircraft()"""
+        old_icao = int(self._arrays['icao'][index])
+        if self._index.get(old_icao) == index:
+            del self._index[old_icao]
+        model_id = aircraft.get('model', self._defaults['model'])
+        if model_id not in self._allocated:
+            self._allocate(model_id)
+        for name, _ in self._fields:
+            if name in SEGMENT_START:
+                # A new aircraft starts its trajectory segment where it is
+                value = aircraft.get(name, aircraft[SEGMENT_START[name]])
+            elif name in self._defaults:
+                value = aircraft.get(name, self._defaults[name])
+            else:
+                value = aircraft[name]
+            if name == 'icao' and isinstance(value, str):
+                value = int(value, 16)
+            elif name == 'callsign':
+                value = value.encode('ascii')
+            self._arrays[name][index] = value
+        if self._models is not None and model_id not in self._models:
+            # The model an overwritten slot flew stays listed until a removal recounts
+            self._models = sorted(self._models + [model_id])
+        self._start_segments(slice(index, index + 1))
+        self._index[int(self._arrays['icao'][index])] = index
+    
+    def add(self, aircraft):
+        """Append an aircraft dict and return its index"""
+        if self.size == self.capacity:
+            self._grow()
+        index = self.size
+        self.size += 1
+        self._rebind()
+        self.set(index, aircraft)
+        return index
+    
+    def remove(self, index):
+        """Remove an aircraft by moving the last one into its slot"""
+        last = self.size - 1
+        icao = int(self._arrays['icao'][index])
+        if self._index.get(icao) == index:
+            del self._index[icao]
+        for array in self._arrays.values():
+            array[index] = array[last]
+        if index != last:
+            self._index[int(self._arrays['icao'][index])] = index
+        self.size = last
+        self._models = None
+        self._rebind()
+    
+    def index_of(self, icao):
+        """Current slot of an aircraft by integer ICAO address, or None if it has left"""
+        return self._index.get(icao)
+    
+    def icao_hex(self, index):
+        """ICAO address of an aircraft as a 6-digit hex string"""
+        return f"{int(self.icao[index]):06X}"
+    
+    def aircraft(self, index):
+        """Return a dict snapshot of one aircraft, in generate_aircraft() form"""
+        fields = FLEET_FIELDS + tuple((name, dtype) for name, dtype, _ in MOTION_MODELS[self.model[index]].fields)
+        record = {name: self._arrays[name][index].item() for name, _ in fields}
+        record['icao'] = self.icao_hex(index)
+        record['callsign'] = record['callsign'].decode('ascii')
+        return record
+    
+    def _start_segments(self, which):
+        """Cache the geodesic and motion model constants of the segments starting in the given slots"""
+        constants = geodesic_constants(self._arrays['lat0'][which], self._arrays['heading0'][which])
+        for name, value in zip(GEODESIC_FIELDS, constants):
+            self._arrays[name][which] = value
+        models = self.models()
+        if models != [0]:
+            index = np.arange(self.size)[which]
+            for model_id in models:
+                members = index[self.model[index] == model_id]
+                if len(members):
+                    MOTION_MODELS[model_id].start(self, members)
+    
+    def positions_at(self, t, index=None):
+        """
+        Closed-form straight-line (lat, lon, alt, heading) arrays of every
+        aircraft, or of the slots in index, at time t (a scalar or
+        per-aircraft array)
+        
+        Each aircraft flies the WGS84 geodesic leaving its segment start at
+        heading0, so any time can be reached in one step without replaying
+        the ones before it; heading is the track at that point.
+        """
+        which = slice(None) if index is None else index
+        elapsed = np.asarray(t, dtype=np.float64) - self.t0[which]
+        distance = self.speed[which].astype(np.float64) * METRES_PER_KNOT_SECOND * elapsed
+        constants = tuple(getattr(self, name)[which] for name in GEODESIC_FIELDS)
+        lat, lon, heading = geodesic_evaluate(constants, self.lon0[which], distance)
+        alt = np.clip(self.alt0[which] + (self.climb_rate[which].astype(np.float64) / 60.0) * elapsed, 1000, 45000)
+        return lat, lon, alt, heading
+    
+    def update(self, t, index=None):
+        """
+        Evaluate every aircraft, or the slots in index, at time t (a scalar,
+        or an array per aircraft or per slot in index) into lat, lon, alt and
+        heading, with one call per motion model flown, or one float
+        evaluation per aircraft when only a few are due. odd_frame is left
+        alone; the scheduler flips it on each position frame.
+        """
+        models = self.models()
+        if len(models) == 1:
+            self._evaluate(MOTION_MODELS[models[0]], t, index)
+        elif index is not None and len(index) <= SCALAR_EVALUATION_LIMIT:
+            stats = self.motion_stats
+            for k, i in enumerate(index):
+                model = MOTION_MODELS[self.model[i]]
+                started = time.perf_counter()
+                model.evaluate_one(self, float(t[k]) if isinstance(t, np.ndarray) else t, i)
+                stats.record(model.name, 1, time.perf_counter() - started)
+        else:
+            model_of = self.model if index is None else self.model[index]
+            for model_id in models:
+                selected = np.flatnonzero(model_of == model_id)
+                if len(selected):
+                    self._evaluate(MOTION_MODELS[model_id], t[selected] if isinstance(t, np.ndarray) else t,
+                                   selected if index is None else index[selected])
+        self.last_update[slice(None) if index is None else index] = t
+    
+    def _evaluate(self, model, t, index):
+        """Evaluate one motion model's aircraft, one by one when there are few of them, timed into motion_stats"""
+        started = time.perf_counter()
+        if index is not None and len(index) <= SCALAR_EVALUATION_LIMIT:
+            if isinstance(t, np.ndarray):
+                for k, i in enumerate(index):
+                    model.evaluate_one(self, float(t[k]), i)
+            else:
+                for i in index:
+                    model.evaluate_one(self, t, i)
+        else:
+            model.evaluate(self, t, slice(None) if index is None else index)
+        count = self.size if index is None else len(index)
+        self.motion_stats.record(model.name, count, time.perf_counter() - started)
+    
+    def housekeeping(self, t, rng=random):
+        """Let each motion model flown adjust its aircraft, evaluated at time t, once per housekeeping check"""
+        for model_id in self.models():
+            model = MOTION_MODELS[model_id]
+            if type(model).housekeeping is not MotionModel.housekeeping:
+                model.housekeeping(self, np.flatnonzero(self.model == model_id), t, rng)
+    
+    def advance(self, dt):
+        """Move every aircraft forward by dt seconds (a scalar or per-aircraft array)"""
+        self.update(self.last_update + dt)
+    
+    def rebase(self, t, index=None):
+        """Start a new trajectory segment for every aircraft, or the slots in index, at its current state, at time t"""
+        which = slice(0, self.size) if index is None else index
+        self.lat0[which] = self.lat[which]
+        self.lon0[which] = self.lon[which]
+        self.alt0[which] = self.alt[which]
+        self.heading0[which] = self.heading[which]
+        self.t0[which] = t
+        self.last_update[which] = t
+        self._start_segments(which)
+
+class MotionStats:
+    """Aircraft evaluations and time spent in them, by motion model"""
+    def __init__(self):
+        self.aircraft = {}
+        self.seconds = {}
+    
+    def record(self, name, aircraft, seconds):
+        self.aircraft[name] = self.aircraft.get(name, 0) + aircraft
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+    
+    def merge(self, other):
+        """Add the counts of another MotionStats, e.g. from a worker process"""
+        for name, aircraft in other.aircraft.items():
+            self.record(name, aircraft, other.seconds[name])
+    
+    def summary(self):
+        """One-line report of evaluations and mean cost per aircraft for each motion model"""
+        parts = [f"{name} {self.aircraft[name]} x {1e6 * self.seconds[name] / self.aircraft[name]:.2f} µs"
+                 for name in sorted(self.aircraft) if self.aircraft[name]]
+        return ", ".join(parts) if parts else "empty"
+
+# Registered motion models; an aircraft's model field is its index here
+MOTION_MODELS = []
+MOTION_MODEL_IDS = {}
+
+def register_motion_model(cls):
+    """
+    Class decorator adding a MotionModel to the registry; a Fleet adds the
+    model's fields to its arrays when its first aircraft flies it
+    """
+    model = cls()
+    model.id = len(MOTION_MODELS)
+    MOTION_MODELS.append(model)
+    MOTION_MODEL_IDS[model.name] = model.id
+    return cls
+
+class MotionModel:
+    """
+    How a group of aircraft moves, evaluated in closed form from the start
+    of their trajectory segments
+    
+    fields are the (name, dtype, default) per-aircraft arrays the model adds
+    to the Fleet. setup() draws the parameters of a newly generated aircraft
+    dict, start() caches per-segment constants, evaluate() writes the state
+    at time t of the slots in which (an index array or slice) and
+    evaluate_one() that of one slot with plain floats. housekeeping(), if
+    overridden, runs once per housekeeping check with the model's slots.
+    Models with generated False are not drawn for generated aircraft.
+    """
+    name = None
+    fields = ()
+    generated = True
+    
+    def setup(self, aircraft, rng):
+        pass
+    
+    def start(self, fleet, index):
+        pass
+    
+    def evaluate(self, fleet, t, which):
+        raise NotImplementedError
+    
+    def evaluate_one(self, fleet, t, i):
+        """evaluate() of a single slot; models without a float path evaluate a one-slot array"""
+        self.evaluate(fleet, t, np.array([i]))
+    
+    def housekeeping(self, fleet, index, t, rng):
+        pass
+
+@register_motion_model
+class StraightModel(MotionModel):
+    """The WGS84 geodesic from the segment start at heading0, at constant speed and climb rate"""
+    name = 'straight'
+    
+    def evaluate(self, fleet, t, which):
+        fleet.lat[which], fleet.lon[which], fleet.alt[which], fleet.heading[which] = fleet.positions_at(t, which)
+    
+    def evaluate_one(self, fleet, t, i):
+        elapsed = t - float(fleet.t0[i])
+        distance = float(fleet.speed[i]) * METRES_PER_KNOT_SECOND * elapsed
+        constants = tuple(float(fleet._arrays[name][i]) for name in GEODESIC_FIELDS)
+        fleet.lat[i], fleet.lon[i], fleet.heading[i] = geodesic_evaluate(constants, float(fleet.lon0[i]), distance,
+                                                                         SCALAR_MATH)
+        fleet.alt[i] = max(1000.0, min(45000.0, float(fleet.alt0[i]) + float(fleet.climb_rate[i]) / 60.0 * elapsed))
+
+@register_motion_model
+class TurnModel(MotionModel):
+    """
+    A constant-rate turn: circling the point turn_radius to the side of the
+    segment start, at turn_rate degrees per second (positive to the right)
+    and a constant climb rate
+    """
+    name = 'turn'
+    fields = (
+        ('turn_rate', np.float32, 0.0),
+        ('turn_lat', np.float64, 0.0),
+        ('turn_lon', np.float64, 0.0),
+        ('turn_bearing', np.float64, 0.0),
+        ('turn_radius', np.float64, 0.0),
+    )
+    
+    def setup(self, aircraft, rng):
+        aircraft['turn_rate'] = rng.choice((-3.0, -1.5, 1.5, 3.0))
+    
+    def start(self, fleet, index):
+        rate = fleet.turn_rate[index].astype(np.float64)
+        radius = fleet.speed[index].astype(np.float64) * METRES_PER_KNOT_SECOND / np.radians(np.abs(rate))
+        lat, lon, azimuth = geodesic_direct(fleet.lat0[index], fleet.lon0[index],
+                                            fleet.heading0[index] + np.sign(rate) * 90.0, radius)
+        fleet.turn_lat[index] = lat
+        fleet.turn_lon[index] = lon
+        fleet.turn_bearing[index] = (azimuth + 180.0) % 360.0
+        fleet.turn_radius[index] = radius
+    
+    def evaluate(self, fleet, t, which):
+        elapsed = t - fleet.t0[which]
+        rate = fleet.turn_rate[which].astype(np.float64)
+        fleet.lat[which], fleet.lon[which], outward = geodesic_direct(
+            fleet.turn_lat[which], fleet.turn_lon[which], fleet.turn_bearing[which] + rate * elapsed,
+            fleet.turn_radius[which])
+        fleet.heading[which] = (outward + np.sign(rate) * 90.0) % 360.0
+        climb = fleet.climb_rate[which].astype(np.float64) / 60.0
+        fleet.alt[which] = np.clip(fleet.alt0[which] + climb * elapsed, 1000, 45000)
+    
+    def evaluate_one(self, fleet, t, i):
+        elapsed = t - float(fleet.t0[i])
+        rate = float(fleet.turn_rate[i])
+        fleet.lat[i], fleet.lon[i], outward = geodesic_direct(
+            float(fleet.turn_lat[i]), float(fleet.turn_lon[i]), float(fleet.turn_bearing[i]) + rate * elapsed,
+            float(fleet.turn_radius[i]), SCALAR_MATH)
+        fleet.heading[i] = (outward + math.copysign(90.0, rate)) % 360.0
+        fleet.alt[i] = max(1000.0, min(45000.0, float(fleet.alt0[i]) + float(fleet.climb_rate[i]) / 60.0 * elapsed))
+
+# Flight levels and vertical rates (ft/min) of generated climb/descent profiles
+PROFILE_ALTITUDES = (5000, 10000, 18000, 24000, 31000, 37000)
+PROFILE_RATES = (1000.0, 1500.0, 2500.0)
+
+@register_motion_model
+class ProfileModel(StraightModel):
+    """
+    A climb or descent at profile_rate ft/min to level off at target_alt,
+    along the straight geodesic; climb_rate drops to 0 once level
+    """
+    name = 'profile'
+    fields = (
+        ('target_alt', np.float64, 0.0),
+        ('profile_rate', np.float32, 0.0),
+    )
+    
+    def setup(self, aircraft, rng):
+        target = rng.choice(PROFILE_ALTITUDES)
+        rate = rng.choice(PROFILE_RATES)
+        aircraft['target_alt'] = target
+        aircraft['profile_rate'] = rate if target > aircraft['alt'] else -rate if target < aircraft['alt'] else 0.0
+        aircraft['climb_rate'] = aircraft['profile_rate']
+    
+    def evaluate(self, fleet, t, which):
+        fleet.lat[which], fleet.lon[which], _, fleet.heading[which] = fleet.positions_at(t, which)
+        rate = fleet.profile_rate[which].astype(np.float64)
+        target = fleet.target_alt[which]
+        alt = fleet.alt0[which] + rate / 60.0 * (t - fleet.t0[which])
+        alt = np.where(rate >= 0, np.minimum(alt, target), np.maximum(alt, target))
+        fleet.alt[which] = alt
+        fleet.climb_rate[which] = np.where(alt == target, 0.0, rate)
+    
+    def evaluate_one(self, fleet, t, i):
+        super().evaluate_one(fleet, t, i)
+        rate = float(fleet.profile_rate[i])
+        target = float(fleet.target_alt[i])
+        alt = float(fleet.alt0[i]) + rate / 60.0 * (t - float(fleet.t0[i]))
+        alt = min(alt, target) if rate >= 0 else max(alt, target)
+        fleet.alt[i] = alt
+        fleet.climb_rate[i] = 0.0 if alt == target else rate
+
+# Standard-rate turn flown in holds, in degrees per second
+STANDARD_TURN_RATE = 3.0
+
+# Outbound leg times of generated holds, in seconds
+HOLD_LEG_TIMES = (60.0, 90.0)
+
+@register_motion_model
+class HoldModel(MotionModel):
+    """
+    A level racetrack hold at the segment start: a 180° standard-rate turn
+    (hold_turn degrees per second, positive to the right), hold_leg seconds
+    outbound, a second turn, and the inbound leg back to the fix on
+    heading0
+    
+    start() caches both turn centers and the outbound leg's start, so each
+    evaluation is a single geodesic per aircraft from whichever of them its
+    phase of the circuit needs.
+    """
+    name = 'hold'
+    fields = (
+        ('hold_turn', np.float32, 0.0),
+        ('hold_leg', np.float32, 0.0),
+        ('hold_radius', np.float64, 0.0),
+        ('hold_lat1', np.float64, 0.0),
+        ('hold_lon1', np.float64, 0.0),
+        ('hold_bearing1', np.float64, 0.0),
+        ('hold_outbound_lat', np.float64, 0.0),
+        ('hold_outbound_lon', np.float64, 0.0),
+        ('hold_outbound', np.float64, 0.0),
+        ('hold_lat2', np.float64, 0.0),
+        ('hold_lon2', np.float64, 0.0),
+        ('hold_bearing2', np.float64, 0.0),
+    )
+    
+    def setup(self, aircraft, rng):
+        aircraft['hold_turn'] = rng.choice((STANDARD_TURN_RATE, -STANDARD_TURN_RATE))
+        aircraft['hold_leg'] = rng.choice(HOLD_LEG_TIMES)
+        aircraft['climb_rate'] = 0
+    
+    def start(self, fleet, index):
+        rate = fleet.hold_turn[index].astype(np.float64)
+        side = np.sign(rate) * 90.0
+        speed = fleet.speed[index].astype(np.float64) * METRES_PER_KNOT_SECOND
+        radius = speed / np.radians(np.abs(rate))
+        
+        # First turn about the center beside the fix, ending on the outbound leg
+        lat1, lon1, azimuth = geodesic_direct(fleet.lat0[index], fleet.lon0[index], fleet.heading0[index] + side,
+                                              radius)
+        bearing1 = (azimuth + 180.0) % 360.0
+        outbound_lat, outbound_lon, outward = geodesic_direct(lat1, lon1, bearing1 + 2 * side, radius)
+        outbound = (outward + side) % 360.0
+        
+        # Second turn about the center beside the end of the outbound leg
+        end_lat, end_lon, end_heading = geodesic_direct(outbound_lat, outbound_lon, outbound,
+                                                        speed * fleet.hold_leg[index])
+        lat2, lon2, azimuth = geodesic_direct(end_lat, end_lon, end_heading + side, radius)
+        
+        fleet.hold_radius[index] = radius
+        fleet.hold_lat1[index] = lat1
+        fleet.hold_lon1[index] = lon1
+        fleet.hold_bearing1[index] = bearing1
+        fleet.hold_outbound_lat[index] = outbound_lat
+        fleet.hold_outbound_lon[index] = outbound_lon
+        fleet.hold_outbound[index] = outbound
+        fleet.hold_lat2[index] = lat2
+        fleet.hold_lon2[index] = lon2
+        fleet.hold_bearing2[index] = (azimuth + 180.0) % 360.0
+    
+    def evaluate(self, fleet, t, which):
+        rate = fleet.hold_turn[which].astype(np.float64)
+        leg = fleet.hold_leg[which].astype(np.float64)
+        speed = fleet.speed[which].astype(np.float64) * METRES_PER_KNOT_SECOND
+        turn_time = 180.0 / np.abs(rate)
+        phase = (t - fleet.t0[which]) % (2 * (turn_time + leg))
+        
+        # Outbound turn, outbound leg, inbound turn, inbound leg
+        first = phase < turn_time
+        outbound = ~first & (phase < turn_time + leg)
+        second = ~first & ~outbound & (phase < 2 * turn_time + leg)
+        inbound = ~(first | outbound | second)
+        
+        # Turns start from each center's bearing; the outbound leg from its
+        # cached start; the inbound leg is flown backwards from the fix
+        lat = np.where(first | outbound, fleet.hold_lat1[which], fleet.hold_lat2[which])
+        lon = np.where(first | outbound, fleet.hold_lon1[which], fleet.hold_lon2[which])
+        azimuth = np.where(first, fleet.hold_bearing1[which] + rate * phase,
+                           fleet.hold_bearing2[which] + rate * (phase - turn_time - leg))
+        distance = fleet.hold_radius[which].copy()
+        lat[outbound] = fleet.hold_outbound_lat[which][outbound]
+        lon[outbound] = fleet.hold_outbound_lon[which][outbound]
+        azimuth[outbound] = fleet.hold_outbound[which][outbound]
+        distance[outbound] = (speed * (phase - turn_time))[outbound]
+        lat[inbound] = fleet.lat0[which][inbound]
+        lon[inbound] = fleet.lon0[which][inbound]
+        azimuth[inbound] = fleet.heading0[which][inbound] + 180.0
+        distance[inbound] = (speed * (2 * (turn_time + leg) - phase))[inbound]
+        
+        lat, lon, track = geodesic_direct(lat, lon, azimuth, distance)
+        heading = np.where(outbound, track, track + np.sign(rate) * 90.0)
+        heading[inbound] = track[inbound] + 180.0
+        fleet.lat[which] = lat
+        fleet.lon[which] = lon
+        fleet.heading[which] = heading % 360.0
+        fleet.alt[which] = fleet.alt0[which]
+    
+    def evaluate_one(self, fleet, t, i):
+        rate = float(fleet.hold_turn[i])
+        leg = float(fleet.hold_leg[i])
+        speed = float(fleet.speed[i]) * METRES_PER_KNOT_SECOND
+        side = math.copysign(90.0, rate)
+        turn_time = 180.0 / abs(rate)
+        phase = (t - float(fleet.t0[i])) % (2 * (turn_time + leg))
+        if phase < turn_time:
+            lat, lon, track = geodesic_direct(float(fleet.hold_lat1[i]), float(fleet.hold_lon1[i]),
+                                              float(fleet.hold_bearing1[i]) + rate * phase,
+                                              float(fleet.hold_radius[i]), SCALAR_MATH)
+            heading = track + side
+        elif phase < turn_time + leg:
+            lat, lon, heading = geodesic_direct(float(fleet.hold_outbound_lat[i]), float(fleet.hold_outbound_lon[i]),
+                                                float(fleet.hold_outbound[i]), speed * (phase - turn_time),
+                                                SCALAR_MATH)
+        elif phase < 2 * turn_time + leg:
+            lat, lon, track = geodesic_direct(float(fleet.hold_lat2[i]), float(fleet.hold_lon2[i]),
+                                              float(fleet.hold_bearing2[i]) + rate * (phase - turn_time - leg),
+                                              float(fleet.hold_radius[i]), SCALAR_MATH)
+            heading = track + side
+        else:
+            lat, lon, track = geodesic_direct(float(fleet.lat0[i]), float(fleet.lon0[i]),
+                                              float(fleet.heading0[i]) + 180.0,
+                                              speed * (2 * (turn_time + leg) - phase), SCALAR_MATH)
+            heading = track + 180.0
+        fleet.lat[i] = lat
+        fleet.lon[i] = lon
+        fleet.heading[i] = heading % 360.0
+        fleet.alt[i] = fleet.alt0[i]
+
+# Chance per housekeeping check that a random walk aircraft changes heading,
+# and the standard deviation of the change in degrees
+RANDOM_WALK_CHANCE = 0.05
+RANDOM_WALK_TURN = 30.0
+
+@register_motion_model
+class RandomWalkModel(StraightModel):
+    """Straight geodesic segments, each housekeeping check turning onto a new random heading with RANDOM_WALK_CHANCE"""
+    name = 'random_walk'
+    
+    def housekeeping(self, fleet, index, t, rng):
+        turned = [i for i in index if rng.random() < RANDOM_WALK_CHANCE]
+        for i in turned:
+            fleet.heading[i] = (float(fleet.heading[i]) + rng.gauss(0.0, RANDOM_WALK_TURN)) % 360.0
+        if turned:
+            fleet.rebase(t, np.array(turned))
+
+@register_motion_model
+class PlanModel(MotionModel):
+    """The flight plan in plan of the fleet's FlightPlans, started at plan_start"""
+    name = 'plan'
+    fields = (
+        ('plan', np.int32, -1),
+        ('plan_start', np.float64, 0.0),
+    )
+    generated = False
+    
+    def evaluate(self, fleet, t, which):
+        (fleet.lat[which], fleet.lon[which], fleet.alt[which], fleet.heading[which],
+         fleet.speed[which], fleet.climb_rate[which]) = fleet.plans.evaluate(fleet.plan[which],
+                                                                             t - fleet.plan_start[which])
+    
+    def evaluate_one(self, fleet, t, i):
+        (fleet.lat[i], fleet.lon[i], fleet.alt[i], fleet.heading[i],
+         fleet.speed[i], fleet.climb_rate[i]) = fleet.plans.evaluate_one(int(fleet.plan[i]),
+                                                                         t - float(fleet.plan_start[i]))
+
+def motion_mix(weights):
+    """Validate a {model name: weight} mix of generated motion models; raises ValueError"""
+    motion = {}
+    for name, weight in weights.items():
+        model = MOTION_MODEL_IDS.get(name)
+        if model is None or not MOTION_MODELS[model].generated:
+            names = ', '.join(entry.name for entry in MOTION_MODELS if entry.generated)
+            raise ValueError(f"unknown motion model {name!r} (choose from {names})")
+        motion[name] = float(weight)
+        if motion[name] < 0:
+            raise ValueError(f"negative weight for motion model {name!r}")
+    if not sum(motion.values()):
+        raise ValueError("no motion model has a weight")
+    return motion
+
+def parse_motion(text):
+    """Parse a --motion 'model=weight,...' mix, e.g. 'straight=8,turn=1,hold=1'; a bare name has weight 1"""
+    weights = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        weights[name.strip()] = weight or 1.0
+    try:
+        return motion_mix(weights)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+# Default coverage radius around the center, in degrees (~60 nautical miles)
+COVERAGE_RADIUS = 1.0
+
+# Side of the square cells a coverage polygon is rasterised into, in degrees
+GRID_CELL_SIZE = 0.02
+
+# Cell classes of a rasterised coverage polygon
+CELL_OUTSIDE = 0
+CELL_INSIDE = 1
+CELL_EDGE = 2
+
+def points_in_polygon(lats, lons, polygon):
+    """Even-odd test of many points against one polygon of (lat, lon) vertices, one pass per edge"""
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    inside = np.zeros(lats.shape, dtype=np.bool_)
+    for (lat1, lon1), (lat2, lon2) in zip(polygon, np.roll(polygon, -1, axis=0)):
+        if lat1 == lat2:
+            continue
+        crosses = (lat1 > lats) != (lat2 > lats)
+        lon_at = lon1 + (lats - lat1) * (lon2 - lon1) / (lat2 - lat1)
+        inside ^= crosses & (lons < lon_at)
+    return inside
+
+def parse_polygon(text):
+    """Parse 'lat,lon;lat,lon;...' into an array of at least 3 (lat, lon) vertices"""
+    try:
+        vertices = [tuple(float(value) for value in pair.split(',')) for pair in text.split(';') if pair.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid polygon: {text!r}")
+    if len(vertices) < 3 or any(len(vertex) != 2 for vertex in vertices):
+        raise argparse.ArgumentTypeError("a polygon needs at least 3 'lat,lon' vertices separated by ';'")
+    return np.array(vertices, dtype=np.float64)
+
+class Coverage:
+    """
+    Area the simulated traffic is kept in: a radius around the center, or a
+    polygon of (lat, lon) vertices
+    
+    lat, long, aircraft and motion mirror the command line arguments, so a
+    Coverage can be handed to generate_aircraft() directly; a scenario has
+    one named Coverage per region. A polygon is rasterised once into a
+    uniform grid of cells that are inside, outside or cut by an edge;
+    contains() looks up every aircraft's cell in one vectorized pass and
+    runs the exact polygon test only for aircraft in edge cells.
+    """
+    def __init__(self, lat=AUGUSTA_LAT, lon=AUGUSTA_LON, aircraft=10, radius=COVERAGE_RADIUS, polygon=None,
+                 cell_size=GRID_CELL_SIZE, name=None, motion=None):
+        self.name = name
+        self.lat = lat
+        self.long = lon
+        self.aircraft = aircraft
+        self.motion = motion
+        self.radius = radius
+        self.polygon = None if polygon is None else np.asarray(polygon, dtype=np.float64)
+        self.cell_size = cell_size
+        if self.polygon is not None:
+            self._build_grid()
+    
+    def _build_grid(self):
+        """Classify every grid cell over the polygon's bounding box, plus a border of outside cells"""
+        size = self.cell_size
+        self.origin = self.polygon.min(axis=0) - size
+        rows, cols = (np.floor((self.polygon.max(axis=0) - self.origin) / size).astype(int) + 2)
+        grid = np.full((rows, cols), CELL_OUTSIDE, dtype=np.uint8)
+        
+        # Cells whose centers are inside; edge cells are overwritten below
+        row_centers = self.origin[0] + (np.arange(rows) + 0.5) * size
+        col_centers = self.origin[1] + (np.arange(cols) + 0.5) * size
+        lats, lons = np.meshgrid(row_centers, col_centers, indexing='ij')
+        grid[points_in_polygon(lats, lons, self.polygon)] = CELL_INSIDE
+        
+        # Every cell an edge passes through: within the edge's bounding box,
+        # with its corners not all on the same side of the edge's line
+        for (lat1, lon1), (lat2, lon2) in zip(self.polygon, np.roll(self.polygon, -1, axis=0)):
+            r0, r1 = sorted(np.floor((np.array((lat1, lat2)) - self.origin[0]) / size).astype(int))
+            c0, c1 = sorted(np.floor((np.array((lon1, lon2)) - self.origin[1]) / size).astype(int))
+            r1, c1 = min(r1, rows - 1), min(c1, cols - 1)
+            corner_lats = self.origin[0] + np.arange(r0, r1 + 2) * size
+            corner_lons = self.origin[1] + np.arange(c0, c1 + 2) * size
+            side = np.sign((lat2 - lat1) * (corner_lons[None, :] - lon1)
+                           - (lon2 - lon1) * (corner_lats[:, None] - lat1))
+            corners = np.stack((side[:-1, :-1], side[:-1, 1:], side[1:, :-1], side[1:, 1:]))
+            cut = (corners.min(axis=0) <= 0) & (corners.max(axis=0) >= 0)
+            grid[r0:r1 + 1, c0:c1 + 1][cut] = CELL_EDGE
+        self.grid = grid
+    
+    def contains(self, lats, lons):
+        """Boolean array telling which of the given positions are inside the coverage area"""
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        if self.polygon is None:
+            return np.hypot(lats - self.lat, lons - self.long) <= self.radius
+        
+        # Positions off the grid are clamped into its border of outside cells
+        rows, cols = self.grid.shape
+        row = np.clip((lats - self.origin[0]) / self.cell_size, 0, rows - 1).astype(np.intp)
+        col = np.clip((lons - self.origin[1]) / self.cell_size, 0, cols - 1).astype(np.intp)
+        cells = self.grid[row, col]
+        
+        inside = cells == CELL_INSIDE
+        edge = np.flatnonzero(cells == CELL_EDGE)
+        if edge.size:
+            inside[edge] = points_in_polygon(lats[edge], lons[edge], self.polygon)
+        return inside
+    
+    def describe(self):
+        """Short description for status messages"""
+        if self.polygon is None:
+            area = f"{self.radius:g}° around (LAT: {self.lat}, LON: {self.long})"
+        else:
+            area = f"{len(self.polygon)}-vertex polygon, spawning around (LAT: {self.lat}, LON: {self.long})"
+        return area if self.name is None else f"{self.name}: {area}"
+
+# Flight plan segment kinds: a geodesic leg, or a constant-radius arc about a center
+SEGMENT_LEG = 0
+SEGMENT_ARC = 1
+
+# Flight plan segment start times are keyed plan * PLAN_TIME_SPAN + start,
+# so no plan may last longer than this many seconds
+PLAN_TIME_SPAN = 1e7
+
+# Fleet region of aircraft flying a flight plan rather than kept in a region
+PLAN_REGION = 0xFFFF
+
+class PlanCompiler:
+    """
+    Walks a flight plan route and emits its segments: geodesic legs
+    between waypoints, DME-style arcs and racetrack holds
+    
+    Segments are dicts timed in seconds from the plan's start; altitude
+    changes linearly along a leg to meet the next waypoint's constraint.
+    """
+    def __init__(self, lat, lon, speed, altitude):
+        self.lat = lat
+        self.lon = lon
+        self.heading = 0.0
+        self.speed = speed
+        self.alt = altitude
+        self.time = 0.0
+        self.segments = []
+    
+    def _emit(self, kind, duration, lat, lon, heading, climb=0.0, radius=0.0, turn=0.0):
+        self.segments.append({'start': self.time, 'kind': kind, 'lat': lat, 'lon': lon, 'heading': heading,
+                              'speed': self.speed, 'alt': self.alt, 'climb': climb, 'radius': radius, 'turn': turn})
+        self.time += duration
+        self.alt += climb / 60.0 * duration
+    
+    def leg(self, lat, lon, altitude=None):
+        """Fly the geodesic to a waypoint, meeting its altitude on arrival"""
+        distance, azimuth, arrival = geodesic_inverse(self.lat, self.lon, lat, lon)
+        duration = distance / (self.speed * METRES_PER_KNOT_SECOND)
+        climb = 0.0
+        if altitude is not None and duration > 0:
+            climb = (altitude - self.alt) / duration * 60.0
+        if duration > 0:
+            self._emit(SEGMENT_LEG, duration, self.lat, self.lon, azimuth, climb)
+            self.heading = arrival
+        self.lat, self.lon = lat, lon
+        if altitude is not None:
+            self.alt = altitude
+    
+    def straight(self, duration):
+        """Fly the current heading for duration seconds"""
+        self._emit(SEGMENT_LEG, duration, self.lat, self.lon, self.heading)
+        distance = self.speed * METRES_PER_KNOT_SECOND * duration
+        lat, lon, heading = geodesic_direct(self.lat, self.lon, self.heading, distance, SCALAR_MATH)
+        self.lat, self.lon, self.heading = lat, lon, heading
+    
+    def arc(self, center_lat, center_lon, to_bearing, direction):
+        """Turn about a center at the current distance until on to_bearing from it; direction +1 right, -1 left"""
+        radius, bearing, _ = geodesic_inverse(center_lat, center_lon, self.lat, self.lon)
+        if radius == 0.0:
+            raise ValueError(f"arc about {center_lat}, {center_lon} starts on its center")
+        sweep = ((to_bearing - bearing) * direction) % 360.0
+        turn = direction * math.degrees(self.speed * METRES_PER_KNOT_SECOND / radius)
+        self._emit(SEGMENT_ARC, sweep / abs(turn), center_lat, center_lon, bearing, radius=radius, turn=turn)
+        self.lat, self.lon, outward = geodesic_direct(center_lat, center_lon, bearing + direction * sweep, radius,
+                                                      SCALAR_MATH)
+        self.heading = (outward + direction * 90.0) % 360.0
+    
+    def turn(self, angle, direction, rate=STANDARD_TURN_RATE):
+        """Turn through angle degrees at rate degrees per second; direction +1 right, -1 left"""
+        radius = self.speed * METRES_PER_KNOT_SECOND / math.radians(rate)
+        center_lat, center_lon, outward = geodesic_direct(self.lat, self.lon, self.heading + direction * 90.0,
+                                                          radius, SCALAR_MATH)
+        bearing = (outward + 180.0) % 360.0
+        self._emit(SEGMENT_ARC, angle / rate, center_lat, center_lon, bearing, radius=radius, turn=direction * rate)
+        self.lat, self.lon, outward = geodesic_direct(center_lat, center_lon, bearing + direction * angle, radius,
+                                                      SCALAR_MATH)
+        self.heading = (outward + direction * 90.0) % 360.0
+    
+    def hold(self, inbound, direction, leg_time, count):
+        """Fly count racetrack circuits at the current fix, joining directly on the inbound course"""
+        fix_lat, fix_lon, fix_alt = self.lat, self.lon, self.alt
+        self.heading = inbound
+        for _ in range(count):
+            self.turn(180.0, direction)
+            self.straight(leg_time)
+            self.turn(180.0, direction)
+            self.leg(fix_lat, fix_lon, fix_alt)
+            self.heading = inbound
+
+def compile_flight_plan(flight):
+    """
+    Compile a scenario flight into (segments, duration)
+    
+    The route is a list of waypoints {"lat", "lon", optional "alt"}, arcs
+    {"arc": {"lat", "lon", "to_bearing", "direction"}} and holds at the
+    last fix {"hold": {"inbound", "direction", "leg_seconds", "count"}};
+    any item may set a new "speed" from there on.
+    """
+    route = flight['route']
+    first = route[0]
+    compiler = PlanCompiler(float(first['lat']), float(first['lon']), float(flight.get('speed', 250.0)),
+                            float(first.get('alt', flight.get('altitude', 10000.0))))
+    for item in route[1:]:
+        if 'speed' in item:
+            compiler.speed = float(item['speed'])
+        if 'arc' in item:
+            arc = item['arc']
+            compiler.arc(float(arc['lat']), float(arc['lon']), float(arc['to_bearing']),
+                         1 if arc.get('direction', 'right') == 'right' else -1)
+        elif 'hold' in item:
+            hold = item['hold']
+            compiler.hold(float(hold['inbound']), 1 if hold.get('direction', 'right') == 'right' else -1,
+                          float(hold.get('leg_seconds', 60.0)), int(hold.get('count', 1)))
+        else:
+            compiler.leg(float(item['lat']), float(item['lon']), item.get('alt'))
+    if not compiler.segments:
+        raise ValueError(f"flight {flight.get('callsign')} has no route to fly")
+    if compiler.time >= PLAN_TIME_SPAN:
+        raise ValueError(f"flight {flight.get('callsign')} lasts longer than {PLAN_TIME_SPAN:g}s")
+    return compiler.segments, compiler.time
+
+class FlightPlans:
+    """
+    Compiled flight plans and the aircraft scheduled to fly them
+    
+    Every plan's segments sit in one table, in order and keyed by
+    plan * PLAN_TIME_SPAN + start time, so finding the segment of any number
+    of aircraft at any time is one np.searchsorted() followed by a single
+    closed-form evaluation. Geodesic constants of every leg are cached with
+    the table, which finalize() builds after the last add(). Instances are
+    (start offset, plan, callsign, category), in start order; many instances
+    can share one plan.
+    """
+    def __init__(self):
+        self.durations = []
+        self.instances = []
+        self._segments = []
+    
+    def add(self, segments, duration):
+        """Add one compiled plan and return its id"""
+        plan = len(self.durations)
+        for segment in segments:
+            self._segments.append(dict(segment, plan=plan))
+        self.durations.append(duration)
+        return plan
+    
+    def finalize(self):
+        """Build the segment table arrays, once every plan has been added"""
+        segments = self._segments
+        self.keys = np.array([s['plan'] * PLAN_TIME_SPAN + s['start'] for s in segments])
+        for name in ('start', 'lat', 'lon', 'heading', 'speed', 'alt', 'climb', 'radius', 'turn'):
+            setattr(self, name, np.array([s[name] for s in segments], dtype=np.float64))
+        self.kind = np.array([s['kind'] for s in segments], dtype=np.uint8)
+        self.leg_constants = geodesic_constants(self.lat, self.heading)
+        self.duration = np.array(self.durations, dtype=np.float64)
+        # Plain float copies for evaluate_one()
+        self._key_list = self.keys.tolist()
+        self._constant_list = list(zip(*(constant.tolist() for constant in self.leg_constants)))
+    
+    def schedule(self, start, plan, callsign, category, every=0.0, count=1):
+        """
+        Schedule count instances of a plan from start seconds, one every 'every' seconds; several
+        instances are numbered after a callsign shortened to leave room for the widest number
+        """
+        base = callsign[:8 - len(str(count))]
+        for k in range(count):
+            name = callsign if count == 1 else f"{base}{k + 1}"
+            self.instances.append((start + k * every, plan, name, category))
+        self.instances.sort(key=lambda instance: instance[0])
+    
+    def split(self, shards):
+        """Share the instances between shards, each a FlightPlans over the same tables"""
+        parts = []
+        for shard in range(shards):
+            part = copy.copy(self)
+            part.instances = self.instances[shard::shards]
+            parts.append(part)
+        return parts
+    
+    def aircraft(self, plan, callsign, category, icao, start):
+        """Aircraft dict, in generate_aircraft() form, of icao starting a plan at time start"""
+        lat, lon, alt, heading, speed, climb = self.evaluate(np.array([plan]), np.zeros(1))
+        return {
+            'icao': icao,
+            'alt': float(alt[0]),
+            'speed': float(speed[0]),
+            'heading': float(heading[0]),
+            'climb_rate': float(climb[0]),
+            'callsign': callsign,
+            'category': category,
+            'lat': float(lat[0]),
+            'lon': float(lon[0]),
+            'last_update': start,
+            'odd_frame': False,
+            'region': PLAN_REGION,
+            'model': MOTION_MODEL_IDS['plan'],
+            'plan': plan,
+            'plan_start': start,
+        }
+    
+    def evaluate(self, plan, elapsed):
+        """
+        (lat, lon, alt, heading, speed, climb) arrays of aircraft flying the
+        given plans, elapsed seconds after their start
+        """
+        plan = np.asarray(plan)
+        elapsed = np.clip(np.asarray(elapsed, dtype=np.float64), 0.0, self.duration[plan])
+        segment = np.searchsorted(self.keys, plan * PLAN_TIME_SPAN + elapsed, 'right') - 1
+        tau = elapsed - self.start[segment]
+        
+        lat = np.empty(segment.shape)
+        lon = np.empty(segment.shape)
+        heading = np.empty(segment.shape)
+        legs = self.kind[segment] == SEGMENT_LEG
+        if legs.any():
+            leg = segment[legs]
+            constants = tuple(field[leg] for field in self.leg_constants)
+            distance = self.speed[leg] * METRES_PER_KNOT_SECOND * tau[legs]
+            lat[legs], lon[legs], heading[legs] = geodesic_evaluate(constants, self.lon[leg], distance)
+        arcs = ~legs
+        if arcs.any():
+            arc = segment[arcs]
+            bearing = self.heading[arc] + self.turn[arc] * tau[arcs]
+            lat[arcs], lon[arcs], outward = geodesic_direct(self.lat[arc], self.lon[arc], bearing, self.radius[arc])
+            heading[arcs] = (outward + np.sign(self.turn[arc]) * 90.0) % 360.0
+        
+        alt = self.alt[segment] + self.climb[segment] / 60.0 * tau
+        return lat, lon, alt, heading, self.speed[segment], self.climb[segment]
+    
+    def evaluate_one(self, plan, elapsed):
+        """evaluate() of a single aircraft with plain float math"""
+        elapsed = min(max(elapsed, 0.0), self.durations[plan])
+        segment = bisect.bisect_right(self._key_list, plan * PLAN_TIME_SPAN + elapsed) - 1
+        s = self._segments[segment]
+        tau = elapsed - s['start']
+        if s['kind'] == SEGMENT_LEG:
+            distance = s['speed'] * METRES_PER_KNOT_SECOND * tau
+            lat, lon, heading = geodesic_evaluate(self._constant_list[segment], s['lon'], distance, SCALAR_MATH)
+        else:
+            lat, lon, outward = geodesic_direct(s['lat'], s['lon'], s['heading'] + s['turn'] * tau, s['radius'],
+                                                SCALAR_MATH)
+            heading = (outward + math.copysign(90.0, s['turn'])) % 360.0
+        return lat, lon, s['alt'] + s['climb'] / 60.0 * tau, heading, s['speed'], s['climb']
+
+def load_flight_plans(flights):
+    """Compile the "flights" of a scenario into FlightPlans"""
+    plans = FlightPlans()
+    for flight in flights:
+        callsign = flight['callsign']
+        if len(callsign) > 8 or any(char not in AIS_CODES for char in callsign.upper()):
+            raise ValueError(f"callsign {callsign!r} is not up to 8 characters of the AIS character set")
+        segments, duration = compile_flight_plan(flight)
+        category = EMITTER_CATEGORIES[flight.get('category', 'large')]
+        plans.schedule(float(flight.get('start', 0.0)), plans.add(segments, duration), callsign, category,
+                       float(flight.get('every', 0.0)), int(flight.get('count', 1)))
+    plans.finalize()
+    return plans
+
+class Scenario:
+    """A scenario file: the region Coverages to keep populated, and the FlightPlans (or None) to fly"""
+    def __init__(self, regions, plans=None):
+        self.regions = regions
+        self.plans = plans
+
+def load_scenario(path):
+    """
+    Read a JSON scenario file into a Scenario
+    
+    The file holds {"regions": [...], "flights": [...]}, either of which may
+    be left out. Each region is an object with "name", "lat", "lon",
+    "aircraft" and optionally "radius" (degrees) or "polygon" (a list of
+    [lat, lon] vertices), and a "motion" mix ({model name: weight}). Each
+    flight has a "callsign", "route" (see compile_flight_plan()) and
+    optionally "category", "speed", "altitude", and a "start" offset,
+    "every" seconds and a "count" to launch a stream of aircraft flying it.
+    """
+    try:
+        with open(path) as f:
+            scenario = json.load(f)
+        regions = [Coverage(float(region['lat']), float(region['lon']), int(region['aircraft']),
+                            float(region.get('radius', COVERAGE_RADIUS)), region.get('polygon'),
+                            name=region.get('name', f"region{i}"),
+                            motion=motion_mix(region['motion']) if 'motion' in region else None)
+                   for i, region in enumerate(scenario.get('regions', []))]
+        plans = load_flight_plans(scenario['flights']) if scenario.get('flights') else None
+    except (OSError, ValueError, KeyError, TypeError, IndexError, AttributeError) as e:
+        raise argparse.ArgumentTypeError(f"cannot load scenario {path}: {e}")
+    if not regions and plans is None:
+        raise argparse.ArgumentTypeError(f"scenario {path} has no regions or flights")
+    return Scenario(regions, plans)
+
+def populate_fleet(regions, rng=random, now=None, icao_space=(0, 1)):
+    """Build a Fleet holding each region's aircraft, generated around its center"""
+    fleet = Fleet(sum(region.aircraft for region in regions), icao_space=icao_space)
+    for r, region in enumerate(regions):
+        for _ in range(region.aircraft):
+            aircraft = generate_aircraft(region, rng, now, fleet)
+            aircraft['region'] = r
+            fleet.add(aircraft)
+    return fleet
+
+# Mean emission rate in Hz of each frame type, per aircraft
+EMISSION_RATES = {
+    'position': 2.0,
+    'velocity': 2.0,
+    'identification': 0.2,
+}
+
+# Each emission interval is jittered by up to this fraction of the mean period
+EMISSION_JITTER = 0.2
+
+# Shortest time between scheduler ticks; frames falling due within one tick share a write
+TICK_INTERVAL = 0.01
+
+# Seconds between checks for aircraft leaving, joining or being replaced
+HOUSEKEEPING_INTERVAL = 1.0
+
+class TransmitScheduler:
+    """
+    Priority queue of per-aircraft emission deadlines
+    
+    Every aircraft gets one entry per frame type in EMISSION_RATES, with a
+    random phase offset, so per-aircraft rates do not depend on fleet size.
+    """
+    def __init__(self, rates=EMISSION_RATES, jitter=EMISSION_JITTER, rng=random):
+        self.rates = rates
+        self.jitter = jitter
+        self.rng = rng
+        self._heap = []
+        self._generation = {}
+        self._counter = 0
+    
+    def __len__(self):
+        return len(self._generation)
+    
+    def _push(self, deadline, kind, icao, generation):
+        self._counter += 1
+        heapq.heappush(self._heap, (deadline, self._counter, kind, icao, generation))
+    
+    def add(self, icao, now):
+        """Start scheduling an aircraft, each frame type at a random phase"""
+        generation = self._generation.get(icao, 0) + 1
+        self._generation[icao] = generation
+        for kind, rate in self.rates.items():
+            self._push(now + self.rng.uniform(0, 1.0 / rate), kind, icao, generation)
+    
+    def remove(self, icao):
+        """Stop scheduling an aircraft; its queued entries are dropped lazily"""
+        self._generation.pop(icao, None)
+    
+    def next_deadline(self):
+        """Time of the earliest pending emission, or None if nothing is queued"""
+        return self._heap[0][0] if self._heap else None
+    
+    def pop_due(self, now):
+        """Yield (deadline, kind, icao) for every emission due by now and schedule the next one"""
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            deadline, _, kind, icao, generation = heapq.heappop(heap)
+            if self._generation.get(icao) != generation:
+                continue
+            period = 1.0 / self.rates[kind]
+            next_deadline = deadline + period * self.rng.uniform(1 - self.jitter, 1 + self.jitter)
+            if next_deadline <= now:
+                # Fell behind: drop the missed slots rather than bursting
+                next_deadline = now + period
+            self._push(next_deadline, kind, icao, generation)
+            yield deadline, kind, icao
+
+class FrameSink:
+    """
+    Output stage that coalesces every frame due in a scheduler tick into
+    one preallocated buffer and hands it to the transport in a single write
+    
+    Frames are encoded with one of FRAME_FORMATS; AVR keeps the
+    line-per-frame framing dump1090 expects.
+    """
+    def __init__(self, frame_format='avr', capacity=65536):
+        self.frame_format = frame_format
+        self._format = FRAME_FORMATS[frame_format]
+        self._buffer = bytearray(capacity)
+        self._length = 0
+        self.frames = 0
+        self.syscalls = 0
+        self.bytes_sent = 0
+    
+    def _send(self, data):
+        """Write one buffer to the transport"""
+        raise NotImplementedError
+    
+    def write(self, data):
+        """Queue one encoded frame for the next flush()"""
+        end = self._length + len(data)
+        if end > len(self._buffer):
+            self._buffer.extend(bytes(max(end, 2 * len(self._buffer)) - len(self._buffer)))
+        self._buffer[self._length:end] = data
+        self._length = end
+        self.frames += 1
+    
+    def write_frame(self, frame, timestamp):
+        """Queue a raw frame, encoded in the sink's output format"""
+        self.write(self._format(frame, timestamp))
+    
+    def flush(self):
+        """Send everything queued since the last flush in one system call"""
+        if not self._length:
+            return
+        length = self._length
+        self._length = 0
+        with memoryview(self._buffer) as view:
+            self._send(view[:length])
+        self.syscalls += 1
+        self.bytes_sent += length
+    
+    def queue_depth(self):
+        """Bytes written but not yet delivered by the transport, or None if unknown"""
+        return None
+    
+    @property
+    def pending(self):
+        """Number of bytes queued for the next flush()"""
+        return self._length
+    
+    @property
+    def bytes_per_syscall(self):
+        """Average number of bytes handed to the kernel per send"""
+        return self.bytes_sent / self.syscalls if self.syscalls else 0.0
+    
+    def summary(self):
+        """One-line report of the writes made so far"""
+        return (f"Sent {self.frames} frames, {self.bytes_sent} bytes in {self.syscalls} writes "
+                f"({self.bytes_per_syscall:.0f} bytes/write)")
+
+class SocketSink(FrameSink):
+    """Frame sink writing to a connected TCP socket"""
+    def __init__(self, sock, frame_format='avr', capacity=65536):
+        super().__init__(frame_format, capacity)
+        self.sock = sock
+    
+    def _send(self, data):
+        self.sock.sendall(data)
+    
+    def queue_depth(self):
+        """Unsent bytes in the socket's kernel send queue (Linux only), or None elsewhere"""
+        try:
+            # POSIX-only modules, imported here so flight370 still imports on other platforms
+            import fcntl
+            import termios
+            depth = fcntl.ioctl(self.sock.fileno(), termios.TIOCOUTQ, b'\0\0\0\0')
+        except (ImportError, OSError, AttributeError):
+            return None
+        return int.from_bytes(depth, sys.byteorder)
+
+class FileSink(FrameSink):
+    """Frame sink writing to a binary file object, such as an open corpus file or stdout"""
+    def __init__(self, stream, frame_format='avr', capacity=1 << 20):
+        super().__init__(frame_format, capacity)
+        self.stream = stream
+    
+    def _send(self, data):
+        self.stream.write(data)
+
+# Default reception range and antenna height of a virtual receiver
+RECEIVER_RANGE_NM = 250.0
+RECEIVER_ANTENNA_FT = 50.0
+
+# Nautical miles per degree of latitude
+NM_PER_DEGREE = 60.0
+
+def radio_horizon_nm(altitude_ft, antenna_ft=RECEIVER_ANTENNA_FT):
+    """Line-of-sight distance between an aircraft and a receiver antenna over a smooth earth"""
+    return 1.23 * (np.sqrt(np.maximum(altitude_ft, 0.0)) + np.sqrt(antenna_ft))
+
+class Receiver:
+    """A virtual ground station: its location, reception range, antenna height and output sink"""
+    def __init__(self, name, lat, lon, sink, range_nm=RECEIVER_RANGE_NM, antenna_ft=RECEIVER_ANTENNA_FT):
+        self.name = name
+        self.lat = lat
+        self.lon = lon
+        self.sink = sink
+        self.range_nm = range_nm
+        self.antenna_ft = antenna_ft
+
+class ReceiverNetwork:
+    """
+    Frame sink fanning one fleet's frames out to several Receivers
+    
+    Stands in for a single FrameSink in Simulation. Which receivers hear
+    which aircraft is worked out once per tick, for the whole fleet in one
+    vectorized pass: within the receiver's range and its radio horizon.
+    Each frame is then formatted once per output format and the same bytes
+    are queued on every receiver that hears it.
+    """
+    def __init__(self, fleet, receivers):
+        self.fleet = fleet
+        self.receivers = list(receivers)
+        self._lats = np.array([receiver.lat for receiver in self.receivers], dtype=np.float64)[:, None]
+        self._lons = np.array([receiver.lon for receiver in self.receivers], dtype=np.float64)[:, None]
+        self._ranges = np.array([receiver.range_nm for receiver in self.receivers], dtype=np.float64)[:, None]
+        self._antennas = np.array([receiver.antenna_ft for receiver in self.receivers], dtype=np.float64)[:, None]
+        self._visible = None
+        self.frames = 0
+        self.unheard = 0
+        self.bytes_sent = 0
+    
+    def visibility(self):
+        """Boolean (receivers, aircraft) array of who hears whom at the fleet's current positions"""
+        fleet = self.fleet
+        dlat = (fleet.lat - self._lats) * NM_PER_DEGREE
+        dlon = (fleet.lon - self._lons) * NM_PER_DEGREE * np.cos(np.radians(self._lats))
+        horizon = radio_horizon_nm(fleet.alt, self._antennas)
+        return np.hypot(dlat, dlon) <= np.minimum(self._ranges, horizon)
+    
+    def write_frame(self, frame, timestamp):
+        """Queue a raw frame on every receiver that hears its aircraft"""
+        if self._visible is None:
+            self._visible = self.visibility()
+        self.frames += 1
+        index = self.fleet.index_of((frame[1] << 16) | (frame[2] << 8) | frame[3])
+        hearing = np.flatnonzero(self._visible[:, index]) if index is not None else ()
+        if not len(hearing):
+            self.unheard += 1
+            return
+        encoded = {}
+        for r in hearing:
+            sink = self.receivers[r].sink
+            data = encoded.get(sink.frame_format)
+            if data is None:
+                data = encoded[sink.frame_format] = FRAME_FORMATS[sink.frame_format](frame, timestamp)
+            sink.write(data)
+    
+    def flush(self):
+        """Flush every receiver's sink; visibility is recomputed on the next tick"""
+        self._visible = None
+        try:
+            for receiver in self.receivers:
+                receiver.sink.flush()
+        finally:
+            self.bytes_sent = sum(receiver.sink.bytes_sent for receiver in self.receivers)
+    
+    def queue_depth(self):
+        """Deepest send queue of any receiver, or None if unknown"""
+        depths = [depth for depth in (receiver.sink.queue_depth() for receiver in self.receivers) if depth is not None]
+        return max(depths) if depths else None
+    
+    def summary(self):
+        """Per-receiver write reports"""
+        lines = [f"{self.frames} frames, {self.unheard} heard by no receiver"]
+        lines.extend(f"  {receiver.name}: {receiver.sink.summary()}" for receiver in self.receivers)
+        return "\n".join(lines)
+
+class FrameCacheStats:
+    """Hit and miss counters of the per-aircraft frame caches, by frame type"""
+    def __init__(self):
+        self.hits = {}
+        self.misses = {}
+    
+    def hit(self, kind):
+        self.hits[kind] = self.hits.get(kind, 0) + 1
+    
+    def miss(self, kind):
+        self.misses[kind] = self.misses.get(kind, 0) + 1
+    
+    def summary(self):
+        """One-line report of hits and misses per cached frame type"""
+        parts = []
+        for kind in sorted(set(self.hits) | set(self.misses)):
+            hits = self.hits.get(kind, 0)
+            misses = self.misses.get(kind, 0)
+            parts.append(f"{kind} {hits} hits/{misses} misses ({100.0 * hits / (hits + misses):.1f}%)")
+        return ", ".join(parts) if parts else "empty"
+
+class FrameTemplate:
+    """
+    Reusable frame buffers for one aircraft
+    
+    The DF/CA, ICAO and type code bytes are written once; each build() only
+    patches the altitude/CPR or velocity fields and the CRC in place. The
+    CRC register after those 5 constant header bytes is cached too, so only
+    the 6 changing payload bytes go through crc24(). Velocity frames are
+    only re-encoded when the velocity fields they carry change, not on every
+    small change of track along a geodesic; otherwise the previous frame is
+    served as is and counted as a hit in cache_stats.
+    The identification frame never changes and is encoded on first use.
+    Position frames take the CPR fields from the caller when it has already
+    batch-encoded them.
+    The returned buffer is reused, so it is only valid until the next
+    build() of the same frame type.
+    """
+    __slots__ = ('icao', 'position', 'velocity', '_position_payload', '_velocity_payload',
+                 '_position_state', '_velocity_state', '_velocity_key', 'identification', 'cache_stats')
+    
+    def __init__(self, icao, cache_stats=None):
+        self.icao = icao
+        self.cache_stats = cache_stats if cache_stats is not None else FrameCacheStats()
+        self._velocity_key = None
+        self.identification = None
+        header = frame_header(icao)
+        self.position = bytearray(header + b'\x58' + bytes(9))  # TC 11
+        self.velocity = bytearray(header + b'\x99' + bytes(9))  # TC 19, subtype 1
+        self._position_payload = memoryview(self.position)[5:11]
+        self._velocity_payload = memoryview(self.velocity)[5:11]
+        self._position_state = crc24(self.position[:5])
+        self._velocity_state = crc24(self.velocity[:5])
+    
+    def build(self, fleet, index, kind, cpr=None):
+        """
+        Patch and return the frame of the given type from the aircraft's slot
+        in the fleet; cpr is the (lat_cpr, lon_cpr) of a position frame if
+        already encoded with the slot's current odd_frame
+        """
+        if kind == 'position':
+            is_odd = bool(fleet.odd_frame[index])
+            fleet.odd_frame[index] = not is_odd
+            msg = self.position
+            if cpr is None:
+                pack_airborne_position(msg, float(fleet.lat[index]), float(fleet.lon[index]), float(fleet.alt[index]),
+                                       is_odd)
+            else:
+                pack_airborne_cpr(msg, cpr[0], cpr[1], float(fleet.alt[index]), is_odd)
+            write_crc(msg, self._position_payload, self._position_state)
+            return msg
+        if kind == 'velocity':
+            msg = self.velocity
+            key = velocity_fields(float(fleet.speed[index]), float(fleet.heading[index]), float(fleet.climb_rate[index]))
+            if key == self._velocity_key:
+                self.cache_stats.hit(kind)
+                return msg
+            self.cache_stats.miss(kind)
+            pack_velocity_fields(msg, key)
+            write_crc(msg, self._velocity_payload, self._velocity_state)
+            self._velocity_key = key
+            return msg
+        if kind == 'identification':
+            if self.identification is not None:
+                self.cache_stats.hit(kind)
+                return self.identification
+            self.cache_stats.miss(kind)
+            self.identification = encode_identification(self.icao, fleet.callsign[index].decode('ascii'),
+                                                        int(fleet.category[index]))
+            return self.identification
+        raise ValueError(f"Unknown frame type: {kind}")
+
+def describe_frame(fleet, index, kind):
+    """One-line description of a frame that was just sent"""
+    icao = fleet.icao_hex(index)
+    if kind == 'position':
+        # odd_frame has already been flipped for the next frame
+        parity = "EVEN" if fleet.odd_frame[index] else "ODD"
+        return (f"Sent {parity} frame for {icao} at {fleet.lat[index]:.4f}, {fleet.lon[index]:.4f}, "
+                f"Alt: {int(fleet.alt[index])}ft, Hdg: {int(fleet.heading[index])}°")
+    if kind == 'identification':
+        return f"Sent IDENT frame for {icao} - Callsign: {fleet.callsign[index].decode('ascii')}"
+    return f"Sent VELOCITY frame for {icao} - Speed: {int(fleet.speed[index])} kts, Hdg: {int(fleet.heading[index])}°"
+
+class WallClock:
+    """Real time: now() follows time.time() and sleep_until() really sleeps"""
+    realtime = True
+    
+    def now(self):
+        return time.time()
+    
+    def sleep_until(self, t):
+        time.sleep(max(0.0, t - time.time()))
+
+class VirtualClock:
+    """Simulated time that jumps straight to each wake-up without sleeping"""
+    realtime = False
+    
+    def __init__(self, start=0.0):
+        self._now = start
+    
+    def now(self):
+        return self._now
+    
+    def sleep_until(self, t):
+        self._now = max(self._now, t)
+
+class AcceleratedClock:
+    """Simulated time running factor times faster than the wall clock"""
+    realtime = True
+    
+    def __init__(self, factor, start=None):
+        self.factor = factor
+        self.start = time.time() if start is None else start
+        self._wall_start = time.monotonic()
+    
+    def now(self):
+        return self.start + (time.monotonic() - self._wall_start) * self.factor
+    
+    def sleep_until(self, t):
+        time.sleep(max(0.0, (t - self.now()) / self.factor))
+
+# Clock names accepted by --clock
+CLOCKS = ('wall', 'virtual', 'accelerated')
+
+def make_clock(name, speed=1.0):
+    """Build a clock by name; speed is the accelerated clock's factor"""
+    if name == 'wall':
+        return WallClock()
+    if name == 'virtual':
+        return VirtualClock()
+    if name == 'accelerated':
+        return AcceleratedClock(speed)
+    raise ValueError(f"Unknown clock: {name}")
+
+# Simulated seconds between stats summary lines
+STATS_INTERVAL = 10.0
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+class StatsReporter:
+    """
+    Rate-limited one-line summary of a running simulation: frames/s by type,
+    bytes/s, active aircraft, send-queue depth, tick-lag percentiles, frame
+    cache hit rates and the cost of each motion model
+    """
+    def __init__(self, interval=STATS_INTERVAL):
+        self.interval = interval
+        self._started = None
+        self._bytes_at_start = 0
+        self._counts = {}
+        self._lags = []
+    
+    def frame(self, kind):
+        """Count one frame sent"""
+        self._counts[kind] = self._counts.get(kind, 0) + 1
+    
+    def tick(self, now, lag, simulation):
+        """Record one tick's lag and log a summary once per interval"""
+        self._lags.append(lag)
+        if self._started is None:
+            self._started = now
+            self._bytes_at_start = simulation.sink.bytes_sent
+            return
+        elapsed = now - self._started
+        if elapsed < self.interval:
+            return
+        
+        frames = sum(self._counts.values())
+        by_kind = ", ".join(f"{kind} {count / elapsed:.0f}" for kind, count in sorted(self._counts.items()))
+        bytes_sent = simulation.sink.bytes_sent - self._bytes_at_start
+        depth = simulation.sink.queue_depth()
+        lags = sorted(self._lags)
+        log.info(f"{frames / elapsed:.0f} frames/s ({by_kind}), {bytes_sent / elapsed:.0f} bytes/s, "
+                 f"{len(simulation.fleet)} aircraft, send queue {'n/a' if depth is None else depth} bytes, "
+                 f"tick lag p50 {percentile(lags, 0.5) * 1000:.1f} ms p99 {percentile(lags, 0.99) * 1000:.1f} ms "
+                 f"max {lags[-1] * 1000:.1f} ms, frame cache: {simulation.cache_stats.summary()}, "
+                 f"motion: {simulation.fleet.motion_stats.summary()}")
+        
+        self._started = now
+        self._bytes_at_start = simulation.sink.bytes_sent
+        self._counts = {}
+        self._lags = []
+
+class Simulation:
+    """
+    Scheduler loop state: the fleet, its emission schedule, the output sink
+    and the clock driving the ticks
+    
+    Args:
+        fleet: Fleet to simulate
+        sink: FrameSink receiving the frames
+        clock: WallClock, VirtualClock or AcceleratedClock driving the ticks
+        rng: Source of all randomness (scheduling phases, fleet changes)
+        stats: Optional StatsReporter fed with every frame and tick
+        coverage: Coverage the fleet is kept in, and its target size, or a
+            list of them for a multi-region scenario, indexed by the fleet's
+            region field (default: the default radius around Augusta,
+            current fleet size)
+        plans: Optional FlightPlans; each instance is launched its start
+            offset after the simulation starts, and retired when it
+            finishes its plan
+    
+    Every frame and fleet change is traced on the 'flight370' logger at
+    DEBUG level.
+    """
+    def __init__(self, fleet, sink, clock, rng=random, stats=None, coverage=None, plans=None):
+        self.fleet = fleet
+        self.plans = plans
+        fleet.plans = plans
+        if coverage is None:
+            coverage = Coverage(aircraft=len(fleet))
+        self.regions = list(coverage) if isinstance(coverage, (list, tuple)) else [coverage]
+        self.sink = sink
+        self.clock = clock
+        self.rng = rng
+        self.stats = stats
+        self.wake = None
+        self.templates = {}
+        self.cache_stats = FrameCacheStats()
+        self.scheduler = TransmitScheduler(rng=rng)
+        
+        now = clock.now()
+        fleet.rebase(now)
+        for i in range(len(fleet)):
+            self.scheduler.add(int(fleet.icao[i]), now)
+        self.next_housekeeping = now + HOUSEKEEPING_INTERVAL
+        self.started = now
+        self.launched = 0
+        self.launch_flights(now)
+    
+    def tick(self):
+        """Run one scheduler tick at the clock's current time and return when the next one is due"""
+        fleet = self.fleet
+        sink = self.sink
+        scheduler = self.scheduler
+        stats = self.stats
+        trace = log.isEnabledFor(logging.DEBUG)
+        now = self.clock.now()
+        
+        # Evaluate the trajectories of just the aircraft with frames due
+        due = []
+        for deadline, kind, icao in scheduler.pop_due(now):
+            index = fleet.index_of(icao)
+            if index is not None:
+                due.append((deadline, kind, icao, index))
+        if due:
+            fleet.update(now, np.fromiter((item[3] for item in due), np.intp, len(due)))
+        
+        # CPR-encode the due position frames in one batch, unless there are
+        # only a few; templates patch them in, in due order
+        cprs = None
+        positions = [item[3] for item in due if item[1] == 'position']
+        if len(positions) > SCALAR_EVALUATION_LIMIT:
+            positions = np.array(positions, dtype=np.intp)
+            lat_cpr, lon_cpr = encode_cpr_positions(fleet.lat[positions], fleet.lon[positions],
+                                                    fleet.odd_frame[positions])
+            cprs = zip(lat_cpr.tolist(), lon_cpr.tolist())
+        
+        templates = self.templates
+        for deadline, kind, icao, index in due:
+            template = templates.get(icao)
+            if template is None:
+                template = templates[icao] = FrameTemplate(icao, self.cache_stats)
+            cpr = next(cprs) if cprs is not None and kind == 'position' else None
+            sink.write_frame(template.build(fleet, index, kind, cpr), deadline)
+            if stats is not None:
+                stats.frame(kind)
+            if trace:
+                log.debug(describe_frame(fleet, index, kind))
+        
+        # Send the whole tick in one write
+        try:
+            sink.flush()
+        except Exception as e:
+            if not self.clock.realtime:
+                raise
+            log.error(f"Error sending messages: {e}")
+        
+        if now >= self.next_housekeeping:
+            self.next_housekeeping = now + HOUSEKEEPING_INTERVAL
+            self.housekeeping(now)
+        
+        if stats is not None:
+            stats.tick(now, 0.0 if self.wake is None else max(0.0, now - self.wake), self)
+        
+        # Next tick: the next emission or housekeeping check
+        wake = self.next_housekeeping
+        next_deadline = scheduler.next_deadline()
+        if next_deadline is not None:
+            wake = min(wake, next_deadline)
+        self.wake = max(wake, now + TICK_INTERVAL)
+        return self.wake
+    
+    def housekeeping(self, now):
+        """
+        Let the motion models adjust their aircraft, launch and retire
+        flight plan aircraft, replace aircraft that left their region's
+        coverage area and occasionally add or remove one per region
+        """
+        fleet = self.fleet
+        scheduler = self.scheduler
+        rng = self.rng
+        fleet.update(now)
+        fleet.housekeeping(now, rng)
+        if self.plans is not None:
+            self.retire_flights(now)
+            self.launch_flights(now)
+        
+        # Replace aircraft that have left their region's coverage area
+        for r, region in enumerate(self.regions):
+            members = np.flatnonzero(fleet.region == r)
+            for i in members[~region.contains(fleet.lat[members], fleet.lon[members])]:
+                old_icao = fleet.icao_hex(i)
+                scheduler.remove(int(fleet.icao[i]))
+                self.templates.pop(int(fleet.icao[i]), None)
+                fleet.set(i, self.spawn(r, now))
+                scheduler.add(int(fleet.icao[i]), now)
+                log.debug(f"Aircraft {old_icao} replaced (left the coverage area)")
+        
+        # Add/remove aircraft occasionally
+        for r, region in enumerate(self.regions):
+            if rng.random() >= 0.03:  # 3% chance each check
+                continue
+            members = np.flatnonzero(fleet.region == r)
+            if len(members) < region.aircraft and rng.random() < 0.7:
+                index = fleet.add(self.spawn(r, now))
+                scheduler.add(int(fleet.icao[index]), now)
+                log.debug(f"New aircraft added: {fleet.icao_hex(index)}")
+            elif len(members) > 5:
+                index = int(members[rng.randint(0, len(members)-1)])
+                removed = fleet.icao_hex(index)
+                scheduler.remove(int(fleet.icao[index]))
+                self.templates.pop(int(fleet.icao[index]), None)
+                fleet.remove(index)
+                log.debug(f"Aircraft removed: {removed}")
+    
+    def launch_flights(self, now):
+        """Add the flight plan aircraft due to have started by now"""
+        if self.plans is None:
+            return
+        instances = self.plans.instances
+        while self.launched < len(instances) and self.started + instances[self.launched][0] <= now:
+            offset, plan, callsign, category = instances[self.launched]
+            self.launched += 1
+            icao = draw_icao(self.rng, self.fleet)
+            index = self.fleet.add(self.plans.aircraft(plan, callsign, category, icao, self.started + offset))
+            self.fleet.update(now, [index])
+            self.scheduler.add(int(self.fleet.icao[index]), now)
+            log.debug(f"Aircraft {icao} ({callsign}) started flight plan {plan}")
+    
+    def retire_flights(self, now):
+        """Remove the flight plan aircraft that have finished their plan"""
+        fleet = self.fleet
+        planned = np.flatnonzero(fleet.model == MOTION_MODEL_IDS['plan'])
+        if not len(planned):
+            # The plan fields only exist once the first plan aircraft has been added
+            return
+        finished = planned[now - fleet.plan_start[planned] >= self.plans.duration[fleet.plan[planned]]]
+        # Highest slot first, so removals do not move the others
+        for index in finished[::-1]:
+            icao = int(fleet.icao[index])
+            self.scheduler.remove(icao)
+            self.templates.pop(icao, None)
+            log.debug(f"Aircraft {fleet.icao_hex(index)} finished its flight plan")
+            fleet.remove(int(index))
+    
+    def spawn(self, region, now):
+        """Generate a new aircraft for the region with the given index"""
+        aircraft = generate_aircraft(self.regions[region], self.rng, now, self.fleet)
+        aircraft['region'] = region
+        return aircraft
+    
+    def run(self, end_time=None):
+        """
+        Tick until a tick has run at or after end_time, or forever if it is
+        None, so the frames due at end_time itself are still sent
+        """
+        now = self.clock.now()
+        while end_time is None or now < end_time:
+            now = self.clock.now()
+            self.clock.sleep_until(self.tick())
+
+def run_simulation(fleet, sink, clock, end_time=None, rng=random, stats=None, coverage=None, plans=None):
+    """
+    Run the scheduler loop, writing every due frame to sink
+    
+    Args:
+        fleet: Fleet to simulate
+        sink: FrameSink receiving the frames
+        clock: WallClock, VirtualClock or AcceleratedClock driving the ticks
+        end_time: Clock time to stop at, or None to run until interrupted
+        rng: Source of all randomness (scheduling phases, fleet changes)
+        stats: Optional StatsReporter for periodic summaries
+        coverage: Coverage, or list of region Coverages, the fleet is kept in (see Simulation)
+        plans: Optional FlightPlans whose aircraft join the fleet (see Simulation)
+    
+    Returns the finished Simulation.
+    """
+    simulation = Simulation(fleet, sink, clock, rng, stats, coverage, plans)
+    simulation.run(end_time)
+    return simulation
+
+def send_position_reports(fleet, host='localhost', port=30001, frame_format='avr', duration=None,
+                          clock=None, rng=random, stats=None, coverage=None, plans=None):
+    """Send position reports for every aircraft in the fleet to dump1090"""
+    sink = None
     try:
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         sock.connect((host, port))
-        print(f"Connected to dump1090 AVR input at {host}:{port}")
+        print(f"Connected to dump1090 {frame_format.upper()} input at {host}:{port}")
+        
+        sink = SocketSink(sock, frame_format)
+        clock = clock or WallClock()
+        end_time = clock.now() + duration if duration is not None else None
+        run_simulation(fleet, sink, clock, end_time, rng, stats, coverage, plans)
         
-        while True:
-            current_time = time.time()
-            
-            for aircraft in aircraft_list:
-                # Calculate time elapsed since last update
-                elapsed = current_time - aircraft['last_update']
-                
-                # Update aircraft position
-                update_aircraft_position(aircraft, elapsed)
-                aircraft['last_update'] = current_time
-                
-                # Generate position messages (both even and odd frames)
-                even_message = create_airborne_position_message(
-                    aircraft['icao'],
-                    aircraft['lat'],
-                    aircraft['lon'],
-                    aircraft['alt'],
-                    False  # even frame
-                )
-                
-                odd_message = create_airborne_position_message(
-                    aircraft['icao'],
-                    aircraft['lat'],
-                    aircraft['lon'],
-                    aircraft['alt'],
-                    True  # odd frame
-                )
-                
-                # Generate velocity message (contains heading)
-                velocity_message = create_velocity_message(
-                    aircraft['icao'],
-                    aircraft['speed'],
-                    aircraft['heading'],
-                    aircraft['climb_rate']
-                )
-                
-                try:
-                    # Send even frame
-                    sock.sendall((even_message + "\n").encode('ascii'))
-                    print(f"Sent EVEN frame for {aircraft['icao']} at {aircraft['lat']:.4f}, {aircraft['lon']:.4f}, Alt: {int(aircraft['alt'])}ft, Hdg: {int(aircraft['heading'])}°")
-                    
-                    # Brief pause
-                    time.sleep(0.1)
-                    
-                    # Send odd frame
-                    sock.sendall((odd_message + "\n").encode('ascii'))
-                    print(f"Sent ODD frame for {aircraft['icao']}")
-                    
-                    # Brief pause
-                    time.sleep(0.1)
-                    
-                    # Send velocity message (critical for icon orientation)
-                    sock.sendall((velocity_message + "\n").encode('ascii'))
-                    print(f"Sent VELOCITY frame for {aircraft['icao']} - Speed: {aircraft['speed']} kts, Hdg: {int(aircraft['heading'])}°")
-                    
-                except Exception as e:
-                    print(f"Error sending messages: {e}")
-                
-                # Wait before processing next aircraft
-                time.sleep(0.2)
-            
-            # Check for aircraft that have gone too far and replace them
-            for i, aircraft in enumerate(aircraft_list):
-                # Check if aircraft has moved too far from center
-                distance = math.sqrt((aircraft['lat'] - args.lat)**2 + (aircraft['lon'] - args.long)**2)
-                
-                if distance > 1.0:  # If aircraft is more than ~60 miles from center
-                    # Replace with a new aircraft
-                    aircraft_list[i] = generate_aircraft(args)
-                    print(f"Aircraft {aircraft['icao']} replaced (too far from center)")
-            
-            # Add/remove aircraft occasionally
-            if random.random() < 0.03:  # 3% chance each cycle
-                if len(aircraft_list) < args.aircraft and random.random() < 0.7:
-                    new_aircraft = generate_aircraft(args)
-                    aircraft_list.append(new_aircraft)
-                    print(f"New aircraft added: {new_aircraft['icao']}")
-                elif len(aircraft_list) > 5:
-                    removed = aircraft_list.pop(random.randint(0, len(aircraft_list)-1))
-                    print(f"Aircraft removed: {removed['icao']}")
-            
-            # Pause between complete update cycles
-            time.sleep(1)
-            
     except KeyboardInterrupt:
         print("\nSimulation stopped by user")
     except Exception as e:
@@ -428,29 +2548,297 @@ def send_position_reports(aircraft_list, host='localhost', port=30001):
         traceback.print_exc()
     finally:
         sock.close()
+        if sink is not None:
+            print(sink.summary())
         print("Connection closed")
 
+def write_corpus(fleet, output, frame_format='avr-mlat', duration=3600.0, clock=None, rng=random, stats=None,
+                 coverage=None, plans=None):
+    """
+    Generate duration seconds of traffic to a file ('-' for stdout) as fast
+    as the encoder runs, with frames timestamped on the simulated clock
+    """
+    stream = sys.stdout.buffer if output == '-' else open(output, 'wb')
+    try:
+        sink = FileSink(stream, frame_format)
+        clock = clock or VirtualClock()
+        started = time.perf_counter()
+        simulation = run_simulation(fleet, sink, clock, clock.now() + duration, rng, stats, coverage, plans)
+        elapsed = time.perf_counter() - started
+    finally:
+        if stream is not sys.stdout.buffer:
+            stream.close()
+        else:
+            stream.flush()
+    
+    print(sink.summary(), file=sys.stderr)
+    print(f"Generated {duration:.0f}s of traffic in {elapsed:.2f}s "
+          f"({sink.frames / elapsed if elapsed else 0:.0f} frames/s)", file=sys.stderr)
+    print(f"Frame cache: {simulation.cache_stats.summary()}", file=sys.stderr)
+    print(f"Motion: {fleet.motion_stats.summary()}", file=sys.stderr)
+
+# Chunk file record of the parallel corpus writer: float64 timestamp, then the 14-byte frame
+CHUNK_RECORD = struct.Struct('<d14s')
+
+# Bytes of merged output buffered between writes
+MERGE_FLUSH_BYTES = 1 << 20
+
+class ChunkSink(FileSink):
+    """Frame sink writing fixed-size CHUNK_RECORD (timestamp, frame) records instead of an output format"""
+    def write_frame(self, frame, timestamp):
+        self.write(CHUNK_RECORD.pack(timestamp, bytes(frame)))
+
+def iter_chunk(path):
+    """Yield the (timestamp, frame) records of a chunk file in order"""
+    with open(path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield from CHUNK_RECORD.iter_unpack(data)
+
+def split_regions(regions, shards):
+    """Divide every region's aircraft between shards, as one list of region copies per shard"""
+    split = []
+    for shard in range(shards):
+        shard_regions = []
+        for region in regions:
+            part = copy.copy(region)
+            part.aircraft = region.aircraft // shards + (shard < region.aircraft % shards)
+            shard_regions.append(part)
+        split.append(shard_regions)
+    return split
+
+def generate_chunk(regions, path, duration, seed, start=0.0, plans=None, shard=0, shards=1):
+    """
+    Simulate one shard of the fleet on a virtual clock and write its frames
+    to a chunk file, in timestamp order. Runs in a worker process; its
+    aircraft draw ICAO addresses from the shard's share of the space.
+    
+    Returns the shard's (frames, cache hits, cache misses, MotionStats).
+    """
+    rng = random.Random(seed)
+    clock = VirtualClock(start)
+    fleet = populate_fleet(regions, rng, start, (shard, shards))
+    with open(path, 'wb') as stream:
+        sink = ChunkSink(stream)
+        simulation = run_simulation(fleet, sink, clock, start + duration, rng, None, regions, plans)
+    cache = simulation.cache_stats
+    return sink.frames, sum(cache.hits.values()), sum(cache.misses.values()), fleet.motion_stats
+
+def merge_chunks(paths, sink, flush_bytes=MERGE_FLUSH_BYTES):
+    """Stream a k-way heap merge of sorted chunk files into sink, in timestamp order"""
+    for timestamp, frame in heapq.merge(*(iter_chunk(path) for path in paths)):
+        sink.write_frame(frame, timestamp)
+        if sink.pending >= flush_bytes:
+            sink.flush()
+    sink.flush()
+
+def write_corpus_parallel(regions, output, frame_format='avr-mlat', duration=3600.0, workers=None, seed=None,
+                          start=0.0, plans=None):
+    """
+    Generate a corpus with the fleet sharded across a process pool
+    
+    Each worker simulates its share of every region's aircraft and of the
+    flight plan instances, seeded from seed, into a sorted chunk file next
+    to output; the chunks are then merged into one time-ordered stream.
+    The result is repeatable for a given seed and worker count, but
+    differs from a single-process run.
+    """
+    workers = workers or os.cpu_count() or 1
+    rng = random.Random(seed)
+    seeds = [rng.getrandbits(64) for _ in range(workers)]
+    chunk_dir = os.path.dirname(os.path.abspath(output)) if output != '-' else None
+    
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix='flight370-', dir=chunk_dir) as tmp:
+        paths = [os.path.join(tmp, f"chunk{shard}.bin") for shard in range(workers)]
+        with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(generate_chunk, split_regions(regions, workers), paths,
+                                    [duration] * workers, seeds, [start] * workers,
+                                    plans.split(workers) if plans is not None else [None] * workers,
+                                    range(workers), [workers] * workers))
+        generated = time.perf_counter() - started
+        
+        stream = sys.stdout.buffer if output == '-' else open(output, 'wb')
+        try:
+            sink = FileSink(stream, frame_format)
+            merge_chunks(paths, sink)
+        finally:
+            if stream is not sys.stdout.buffer:
+                stream.close()
+            else:
+                stream.flush()
+    elapsed = time.perf_counter() - started
+    
+    hits = sum(result[1] for result in results)
+    misses = sum(result[2] for result in results)
+    motion = MotionStats()
+    for result in results:
+        motion.merge(result[3])
+    print(sink.summary(), file=sys.stderr)
+    print(f"Generated {duration:.0f}s of traffic with {workers} workers in {elapsed:.2f}s "
+          f"({generated:.2f}s simulating, {elapsed - generated:.2f}s merging; "
+          f"{sink.frames / elapsed if elapsed else 0:.0f} frames/s)", file=sys.stderr)
+    print(f"Frame cache: {hits} hits/{misses} misses", file=sys.stderr)
+    print(f"Motion: {motion.summary()}", file=sys.stderr)
+
+def parse_receiver(text):
+    """Parse a --receiver 'name,lat,lon,destination[,range_nm]' specification"""
+    fields = text.split(',')
+    if len(fields) not in (4, 5):
+        raise argparse.ArgumentTypeError("a receiver is 'name,lat,lon,destination[,range_nm]'")
+    try:
+        return {
+            'name': fields[0],
+            'lat': float(fields[1]),
+            'lon': float(fields[2]),
+            'destination': fields[3],
+            'range_nm': float(fields[4]) if len(fields) == 5 else RECEIVER_RANGE_NM,
+        }
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid receiver: {text!r}")
+
+def is_network_destination(destination):
+    """True for a 'host:port' receiver destination, False for a file path"""
+    host, _, port = destination.rpartition(':')
+    return bool(host) and port.isdigit()
+
+def open_receiver_sink(destination, frame_format):
+    """Open a SocketSink for 'host:port' or a FileSink for a file path"""
+    if is_network_destination(destination):
+        host, _, port = destination.rpartition(':')
+        sock = socket.create_connection((host, int(port)))
+        return SocketSink(sock, frame_format)
+    return FileSink(open(destination, 'wb'), frame_format)
+
+def run_receivers(fleet, specs, frame_format='avr', duration=None, clock=None, rng=random, stats=None,
+                  coverage=None, plans=None):
+    """Simulate the fleet once and feed each receiver in specs (from parse_receiver()) what it hears"""
+    receivers = []
+    try:
+        for spec in specs:
+            sink = open_receiver_sink(spec['destination'], frame_format)
+            receivers.append(Receiver(spec['name'], spec['lat'], spec['lon'], sink, spec['range_nm']))
+            print(f"Receiver {spec['name']} at (LAT: {spec['lat']}, LON: {spec['lon']}) -> {spec['destination']}",
+                  file=sys.stderr)
+        
+        network = ReceiverNetwork(fleet, receivers)
+        clock = clock or WallClock()
+        end_time = clock.now() + duration if duration is not None else None
+        run_simulation(fleet, network, clock, end_time, rng, stats, coverage, plans)
+        print(network.summary(), file=sys.stderr)
+    except KeyboardInterrupt:
+        print("\nSimulation stopped by user", file=sys.stderr)
+    finally:
+        for receiver in receivers:
+            if isinstance(receiver.sink, SocketSink):
+                receiver.sink.sock.close()
+            else:
+                receiver.sink.stream.close()
+
 def main():
     parser = argparse.ArgumentParser(description='ADS-B Traffic Generator with Straight-Line Movement')
     parser.add_argument('--host', default='localhost', help='dump1090 host')
-    parser.add_argument('--port', type=int, default=30001, help='dump1090 AVR input port (default: 30001)')
+    parser.add_argument('--port', type=int, default=None, help='dump1090 input port (default: 30001 for AVR, 30004 for Beast)')
+    parser.add_argument('--format', choices=sorted(FRAME_FORMATS), default=None,
+                        help='Output format (default: avr, or avr-mlat with --output)')
+    parser.add_argument('--output', default=None, help="Write a corpus to this file ('-' for stdout) instead of a live socket")
+    parser.add_argument('--duration', type=float, default=None,
+                        help='Seconds of simulated traffic to generate (default: 3600 with --output, unlimited otherwise)')
+    parser.add_argument('--seed', type=int, default=None, help='Seed for a repeatable scenario (default: random)')
+    parser.add_argument('--clock', choices=CLOCKS, default=None,
+                        help='Simulation clock (default: wall, or virtual with --output)')
+    parser.add_argument('--speed', type=float, default=10.0, help='Speed factor of the accelerated clock (default: 10)')
     parser.add_argument('--aircraft', type=int, default=10, help='Number of aircraft to simulate')
     parser.add_argument('--lat', type=float, default=AUGUSTA_LAT, help="Center latitude")
     parser.add_argument('--long', type=float, default=AUGUSTA_LON, help="Center longitude")
+    parser.add_argument('--radius', type=float, default=COVERAGE_RADIUS,
+                        help=f'Coverage radius around the center in degrees (default: {COVERAGE_RADIUS:g}, about 60 nm)')
+    parser.add_argument('--motion', type=parse_motion, default=None,
+                        help="Mix of motion models for generated aircraft as 'model=weight,...', from "
+                             + ', '.join(model.name for model in MOTION_MODELS if model.generated)
+                             + " (default: all straight)")
+    parser.add_argument('--polygon', type=parse_polygon, default=None,
+                        help="Coverage polygon as 'lat,lon;lat,lon;...' instead of a radius; it should contain the center")
+    parser.add_argument('--scenario', type=load_scenario, default=None,
+                        help='JSON scenario file with several regions and/or flight plans to simulate in this '
+                             'one process (overrides --lat, --long, --aircraft, --radius, --polygon and --motion)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes for --output on the virtual clock; the fleet is split between them '
+                             'and their frames merged in time order (default: 1, 0 for one per core)')
+    parser.add_argument('--receiver', type=parse_receiver, action='append', default=[],
+                        help="Virtual receiver 'name,lat,lon,destination[,range_nm]', where destination is host:port "
+                             "or a file; repeat for several receivers fed from one fleet")
+    parser.add_argument('--log-level', choices=('debug', 'info', 'warning', 'error'), default='info',
+                        help='Logging level; debug traces every frame (default: info)')
+    parser.add_argument('--stats-interval', type=float, default=STATS_INTERVAL,
+                        help=f'Seconds between stats summaries, 0 to disable (default: {STATS_INTERVAL:g})')
     
-    global args
     args = parser.parse_args()
-
-    print(f"Creating {args.aircraft} aircraft around (LAT: {args.lat}, LON: {args.long})")
-    print(f"Aircraft will move in straight lines according to their heading")
-    print(f"Sending data to dump1090 AVR input at {args.host}:{args.port}")
-    print("Press Ctrl+C to stop the simulation")
+    logging.basicConfig(level=getattr(logging, args.log_level.upper()),
+                        format='%(asctime)s %(levelname)s %(message)s')
+    stats = StatsReporter(args.stats_interval) if args.stats_interval > 0 else None
+    # Corpus files get MLAT timestamps and a virtual clock unless asked otherwise
+    to_files = bool(args.output) or (bool(args.receiver) and
+                                     not any(is_network_destination(r['destination']) for r in args.receiver))
+    if args.format is None:
+        args.format = 'avr-mlat' if to_files else 'avr'
+    if args.port is None:
+        args.port = DEFAULT_PORTS[args.format]
+    if args.clock is None:
+        args.clock = 'virtual' if to_files else 'wall'
+    
+    if args.workers != 1 and (not args.output or args.receiver or args.clock != 'virtual'):
+        parser.error("--workers only applies to --output on the virtual clock")
+    
+    # Every random choice in the scenario comes from this generator
+    rng = random.Random(args.seed)
+    clock = make_clock(args.clock, args.speed)
+    if args.scenario:
+        coverage = args.scenario.regions
+        plans = args.scenario.plans
+    else:
+        coverage = [Coverage(args.lat, args.long, args.aircraft, args.radius, args.polygon, motion=args.motion)]
+        plans = None
+    args.aircraft = sum(region.aircraft for region in coverage)
+    
+    if args.workers != 1:
+        duration = args.duration if args.duration is not None else 3600.0
+        print(f"Writing {duration:.0f}s of {args.format} traffic for {args.aircraft} aircraft to {args.output} "
+              f"with {args.workers or os.cpu_count()} workers", file=sys.stderr)
+        write_corpus_parallel(coverage, args.output, args.format, duration, args.workers, args.seed, clock.now(),
+                              plans)
+        return
     
     # Generate initial aircraft
-    aircraft_list = [generate_aircraft(args) for _ in range(args.aircraft)]
+    fleet = populate_fleet(coverage, rng, clock.now())
+    
+    if args.receiver:
+        duration = args.duration if args.duration is not None or not to_files else 3600.0
+        run_receivers(fleet, args.receiver, args.format, duration, clock, rng, stats, coverage, plans)
+        return
+    
+    if args.output:
+        duration = args.duration if args.duration is not None else 3600.0
+        print(f"Writing {duration:.0f}s of {args.format} traffic for {args.aircraft} aircraft to {args.output}",
+              file=sys.stderr)
+        write_corpus(fleet, args.output, args.format, duration, clock, rng, stats, coverage, plans)
+        return
+
+    for region in coverage:
+        print(f"Creating {region.aircraft} aircraft in {region.describe()}")
+    if plans is not None:
+        print(f"Flying {len(plans.instances)} aircraft on {len(plans.durations)} flight plans")
+    if any(region.motion for region in coverage):
+        print("Aircraft will fly their region's mix of motion models")
+    else:
+        print(f"Aircraft will fly WGS84 geodesics from their initial heading")
+    print(f"Sending data to dump1090 {args.format.upper()} input at {args.host}:{args.port}")
+    print("Press Ctrl+C to stop the simulation")
     
     # Start sending data
-    send_position_reports(aircraft_list, args.host, args.port)
+    send_position_reports(fleet, args.host, args.port, args.format, args.duration, clock, rng, stats, coverage,
+                          plans)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,406 @@
+#!/usr/bin/python3
+
+import sys
+import json
+import math
+import random
+import timeit
+import argparse
+import platform
+
+import numpy as np
+
+import flight370
+
+# Default fleet sizes for the kinematics and scheduler tick benchmarks
+FLEET_SIZES = (10, 100, 1000, 10000, 100000)
+
+def random_payloads(count, seed=370):
+    """Build a list of random 11-byte DF17 payloads"""
+    rng = random.Random(seed)
+    return [bytes([0x8D] + [rng.randint(0, 255) for _ in range(10)]) for _ in range(count)]
+
+def time_per_call(func, items, repeat=5):
+    """Return the best ns per call of func over items"""
+    def run():
+        for item in items:
+            func(item)
+    best = min(timeit.repeat(run, number=1, repeat=repeat))
+    return best * 1e9 / len(items)
+
+def time_batch(func, count, repeat=5):
+    """Return the best ns per item of a func() call that handles count items at once"""
+    best = min(timeit.repeat(func, number=1, repeat=repeat))
+    return best * 1e9 / count
+
+def record(results, name, ns_per_op, **extra):
+    """Store and print one benchmark result"""
+    results[name] = {'ns_per_op': round(ns_per_op, 1), 'ops_per_s': round(1e9 / ns_per_op), **extra}
+    print(f"{name:36s} {ns_per_op:12.1f} ns/op {1e9 / ns_per_op:14.0f} ops/s")
+
+def make_scenario(aircraft, motion=None):
+    """Default coverage around the default center, for generate_aircraft() and the simulation's housekeeping"""
+    return flight370.Coverage(aircraft=aircraft, motion=motion)
+
+def make_fleet(size, seed=370, now=0.0, motion=None):
+    """Build a seeded fleet of size aircraft around the default center, flying a mix of motion models if given"""
+    scenario = make_scenario(size, motion)
+    rng = random.Random(seed)
+    fleet = flight370.Fleet(size)
+    for _ in range(size):
+        fleet.add(flight370.generate_aircraft(scenario, rng, now, fleet))
+    return fleet
+
+class NullSink(flight370.FrameSink):
+    """Frame sink that encodes frames and counts ticks but sends nothing"""
+    def __init__(self, frame_format='avr'):
+        super().__init__(frame_format)
+        self.ticks = 0
+
+    def flush(self):
+        self.ticks += 1
+        super().flush()
+
+    def _send(self, data):
+        pass
+
+def check_crc(count):
+    """Check the table-driven crc24() against the bitwise reference"""
+    for payload in random_payloads(count):
+        if flight370.crc24(payload) != flight370.crc24_bitwise(payload):
+            raise AssertionError(f"crc24 mismatch for {payload.hex()}")
+        if flight370.crc24(payload[5:], flight370.crc24(payload[:5])) != flight370.crc24(payload):
+            raise AssertionError(f"incremental crc24 mismatch for {payload.hex()}")
+    print(f"crc24 table and incremental CRC match bitwise reference on {count} payloads")
+
+def nl_check_latitudes(step=1e-4, ulps=200):
+    """Yield a sweep of every latitude in step increments plus the floats around each NL boundary"""
+    count = int(round(180.0 / step))
+    for i in range(count + 1):
+        yield -90.0 + i * step
+    for boundary in flight370.CPR_NL_TABLE + (0.0, 87.0):
+        lat = boundary
+        for _ in range(ulps):
+            lat = math.nextafter(lat, -math.inf)
+        for _ in range(2 * ulps):
+            yield lat
+            yield -lat
+            lat = math.nextafter(lat, math.inf)
+
+def check_cpr_nl():
+    """Check the cprNL() table lookup against the closed-form formula"""
+    checked = 0
+    for lat in nl_check_latitudes():
+        try:
+            expected = flight370.cprNL_formula(lat)
+        except ValueError:
+            # The formula leaves acos's domain in the last ulps below 87 degrees
+            continue
+        if flight370.cprNL(lat) != expected:
+            raise AssertionError(f"cprNL mismatch at {lat!r}")
+        checked += 1
+    print(f"cprNL table matches formula at {checked} latitudes")
+
+def check_cpr_batch(count):
+    """Check encode_cpr_positions() against the scalar encoder"""
+    rng = random.Random(370)
+    lats = [rng.uniform(-89.0, 89.0) for _ in range(count)]
+    lons = [rng.uniform(-180.0, 180.0) for _ in range(count)]
+    for is_odd in (False, True):
+        lat_cpr, lon_cpr = flight370.encode_cpr_positions(lats, lons, is_odd)
+        for i, (lat, lon) in enumerate(zip(lats, lons)):
+            if flight370.encode_cpr_position(lat, lon, is_odd) != (lat_cpr[i], lon_cpr[i]):
+                raise AssertionError(f"CPR mismatch at {lat!r}, {lon!r}")
+    print(f"encode_cpr_positions matches encode_cpr_position on {count} positions")
+
+def check_closed_form(count=20, duration=600.0, step=0.05, tolerance=1e-8):
+    """Check Fleet.positions_at() against many small update_aircraft_position() steps"""
+    fleet = make_fleet(count)
+    aircraft = [fleet.aircraft(i) for i in range(count)]
+    for _ in range(int(round(duration / step))):
+        for a in aircraft:
+            flight370.update_aircraft_position(a, step)
+    lats, lons, alts, headings = fleet.positions_at(fleet.t0 + duration)
+    for i, a in enumerate(aircraft):
+        error = max(abs(lats[i] - a['lat']), abs(lons[i] - a['lon']))
+        if error > tolerance or abs(alts[i] - a['alt']) > 1e-6 or abs(headings[i] - a['heading']) > 1e-6:
+            raise AssertionError(f"closed-form trajectory of {a['icao']} is {error:g} degrees off after {duration:g}s")
+    print(f"Fleet.positions_at matches {step:g}s steps of update_aircraft_position within {tolerance:g} degrees")
+
+def check_geodesic(count, max_distance=5e6, tolerance=0.001):
+    """
+    Check the vectorized Vincenty propagation against geographiclib's WGS84
+    solver: end points within tolerance metres, tracks within 1e-6 degrees
+    """
+    try:
+        from geographiclib.geodesic import Geodesic
+    except ImportError:
+        print("geographiclib not installed, skipping the geodesic reference check")
+        return
+    rng = np.random.default_rng(370)
+    lats = rng.uniform(-85.0, 85.0, count)
+    lons = rng.uniform(-180.0, 180.0, count)
+    azimuths = rng.uniform(0.0, 360.0, count)
+    distances = rng.uniform(0.0, max_distance, count)
+    end_lats, end_lons, end_azimuths = flight370.geodesic_direct(lats, lons, azimuths, distances)
+    worst = 0.0
+    for i in range(count):
+        reference = Geodesic.WGS84.Direct(lats[i], lons[i], azimuths[i], distances[i])
+        error = Geodesic.WGS84.Inverse(end_lats[i], end_lons[i], reference['lat2'], reference['lon2'])['s12']
+        track_error = abs((end_azimuths[i] - reference['azi2'] + 180.0) % 360.0 - 180.0)
+        if error > tolerance or track_error > 1e-6:
+            raise AssertionError(f"geodesic from {lats[i]!r}, {lons[i]!r} at {azimuths[i]!r} for {distances[i]!r} m "
+                                 f"is {error:g} m and {track_error:g} degrees off")
+        worst = max(worst, error)
+    print(f"geodesic_direct matches geographiclib on {count} geodesics up to {max_distance / 1000:.0f} km "
+          f"(worst {worst * 1000:.3f} mm)")
+
+def check_motion_models(count=500, duration=900.0, steps=46):
+    """Check every motion model's float evaluate_one() against its vectorized evaluate()"""
+    models = [model for model in flight370.MOTION_MODELS if model.generated]
+    fleet = make_fleet(count, motion={model.name: 1.0 for model in models})
+    fleet.rebase(0.0)
+    fields = ('lat', 'lon', 'alt', 'heading', 'climb_rate')
+    for t in np.linspace(0.0, duration, steps):
+        for i in range(count):
+            flight370.MOTION_MODELS[fleet.model[i]].evaluate_one(fleet, t, i)
+        scalar = [getattr(fleet, name).copy() for name in fields]
+        fleet.update(t)
+        for name, values in zip(fields, scalar):
+            error = np.abs(values - getattr(fleet, name))
+            if name == 'heading':
+                error = np.abs((error + 180.0) % 360.0 - 180.0)
+            if error.max() > 1e-9:
+                i = int(error.argmax())
+                raise AssertionError(f"{flight370.MOTION_MODELS[fleet.model[i]].name} evaluate_one() {name} is "
+                                     f"{error[i]:g} off evaluate() at {t:g}s")
+    print(f"evaluate_one matches evaluate for the {', '.join(model.name for model in models)} motion models")
+
+def check_geodesic_inverse(count, max_distance=5e6, tolerance=0.001):
+    """Check geodesic_inverse() against geographiclib: lengths within tolerance metres, azimuths within 1e-6 degrees"""
+    try:
+        from geographiclib.geodesic import Geodesic
+    except ImportError:
+        print("geographiclib not installed, skipping the inverse geodesic reference check")
+        return
+    rng = np.random.default_rng(371)
+    worst = 0.0
+    for _ in range(count):
+        lat, lon = rng.uniform(-85.0, 85.0), rng.uniform(-180.0, 180.0)
+        end = Geodesic.WGS84.Direct(lat, lon, rng.uniform(0.0, 360.0), rng.uniform(0.0, max_distance))
+        distance, azimuth1, azimuth2 = flight370.geodesic_inverse(lat, lon, end['lat2'], end['lon2'])
+        reference = Geodesic.WGS84.Inverse(lat, lon, end['lat2'], end['lon2'])
+        error = abs(distance - reference['s12'])
+        azimuth_error = max(abs((azimuth1 - reference['azi1'] + 180.0) % 360.0 - 180.0),
+                            abs((azimuth2 - reference['azi2'] + 180.0) % 360.0 - 180.0))
+        if error > tolerance or azimuth_error > 1e-6:
+            raise AssertionError(f"geodesic from {lat!r}, {lon!r} to {end['lat2']!r}, {end['lon2']!r} "
+                                 f"is {error:g} m and {azimuth_error:g} degrees off")
+        worst = max(worst, error)
+    print(f"geodesic_inverse matches geographiclib on {count} geodesics up to {max_distance / 1000:.0f} km "
+          f"(worst {worst * 1000:.3f} mm)")
+
+def make_plans(plans=10):
+    """Compile plans copies of an approach with legs, a climb, a hold and an arc, shifted apart"""
+    flight_plans = flight370.FlightPlans()
+    for k in range(plans):
+        lat = flight370.AUGUSTA_LAT + 0.01 * k
+        lon = flight370.AUGUSTA_LON
+        route = [
+            {'lat': lat, 'lon': lon},
+            {'lat': lat + 0.3, 'lon': lon + 0.4, 'alt': 12000},
+            {'hold': {'inbound': 45, 'direction': 'right', 'leg_seconds': 60, 'count': 2}},
+            {'arc': {'lat': lat + 0.5, 'lon': lon + 0.5, 'to_bearing': 270, 'direction': 'right'}},
+            {'lat': lat + 0.6, 'lon': lon + 0.8, 'alt': 2000, 'speed': 180},
+        ]
+        segments, duration = flight370.compile_flight_plan({'callsign': 'BENCH', 'speed': 250, 'altitude': 8000,
+                                                            'route': route})
+        flight_plans.add(segments, duration)
+    flight_plans.finalize()
+    return flight_plans
+
+def bench_crc(results, count):
+    """Time the table-driven crc24() and the bitwise reference"""
+    payloads = random_payloads(count)
+    record(results, 'crc24_bitwise', time_per_call(flight370.crc24_bitwise, payloads))
+    record(results, 'crc24', time_per_call(flight370.crc24, payloads))
+    split = [(payload[5:], flight370.crc24(payload[:5])) for payload in payloads]
+    record(results, 'crc24_incremental', time_per_call(lambda p: flight370.crc24(p[0], p[1]), split))
+
+def bench_cpr(results, count):
+    """Time NL lookup and scalar and batch CPR encoding"""
+    rng = random.Random(370)
+    lats = [rng.uniform(-86.9, 86.9) for _ in range(count)]
+    lons = [rng.uniform(-180.0, 180.0) for _ in range(count)]
+    record(results, 'cprNL_formula', time_per_call(flight370.cprNL_formula, lats))
+    record(results, 'cprNL', time_per_call(flight370.cprNL, lats))
+
+    positions = list(zip(lats, lons))
+    record(results, 'encode_cpr_position',
+           time_per_call(lambda p: flight370.encode_cpr_position(p[0], p[1], True), positions))
+    record(results, 'encode_cpr_positions',
+           time_batch(lambda: flight370.encode_cpr_positions(lats, lons, True), count))
+
+def bench_encoders(results, count):
+    """Time the altitude encoder and the message builders"""
+    rng = random.Random(370)
+    altitudes = [rng.uniform(1000, 45000) for _ in range(count)]
+    record(results, 'encode_altitude', time_per_call(flight370.encode_altitude, altitudes))
+
+    fleet = make_fleet(count)
+    aircraft = [fleet.aircraft(i) for i in range(count)]
+    record(results, 'create_airborne_position_message', time_per_call(
+        lambda a: flight370.create_airborne_position_message(a['icao'], a['lat'], a['lon'], a['alt'], True), aircraft))
+    record(results, 'create_velocity_message', time_per_call(
+        lambda a: flight370.create_velocity_message(a['icao'], a['speed'], a['heading'], a['climb_rate']), aircraft))
+    record(results, 'encode_airborne_position', time_per_call(
+        lambda a: flight370.encode_airborne_position(a['icao'], a['lat'], a['lon'], a['alt'], True), aircraft))
+    record(results, 'encode_velocity', time_per_call(
+        lambda a: flight370.encode_velocity(a['icao'], a['speed'], a['heading'], a['climb_rate']), aircraft))
+    record(results, 'encode_identification', time_per_call(
+        lambda a: flight370.encode_identification(a['icao'], a['callsign'], a['category']), aircraft))
+
+def bench_kinematics(results, count, fleet_sizes):
+    """Time per-aircraft dict updates and whole-fleet advance() at each fleet size"""
+    aircraft = [make_fleet(1, seed=i).aircraft(0) for i in range(min(count, 10000))]
+    record(results, 'update_aircraft_position', time_per_call(
+        lambda a: flight370.update_aircraft_position(a, 0.01), aircraft))
+
+    for size in fleet_sizes:
+        fleet = make_fleet(size)
+        record(results, f'Fleet.advance[{size}]', time_batch(lambda: fleet.advance(0.01), size), unit='aircraft')
+
+def bench_motion(results, fleet_sizes):
+    """Time whole-fleet advance() of a fleet flying each generated motion model, and an even mix of them all"""
+    names = [model.name for model in flight370.MOTION_MODELS if model.generated]
+    for size in fleet_sizes:
+        for name, motion in [(name, {name: 1.0}) for name in names] + [('mixed', dict.fromkeys(names, 1.0))]:
+            fleet = make_fleet(size, motion=motion)
+            record(results, f'Fleet.advance[{name},{size}]', time_batch(lambda: fleet.advance(0.01), size),
+                   unit='aircraft')
+
+def bench_plans(results, fleet_sizes):
+    """Time flight plan evaluation of a whole fleet at once, and of one aircraft at a time"""
+    plans = make_plans()
+    rng = np.random.default_rng(370)
+    for size in fleet_sizes:
+        plan = rng.integers(0, len(plans.durations), size)
+        elapsed = rng.uniform(0.0, plans.duration[plan])
+        record(results, f'FlightPlans.evaluate[{size}]', time_batch(lambda: plans.evaluate(plan, elapsed), size),
+               unit='aircraft')
+    pairs = [(int(p), float(e)) for p, e in zip(plan, elapsed)][:10000]
+    record(results, 'FlightPlans.evaluate_one', time_per_call(lambda p: plans.evaluate_one(p[0], p[1]), pairs))
+
+def bench_ticks(results, count, fleet_sizes):
+    """Time complete scheduler ticks, frames encoded into a NullSink, at each fleet size"""
+    for size in fleet_sizes:
+        fleet = make_fleet(size)
+        sink = NullSink()
+        clock = flight370.VirtualClock()
+        simulation = flight370.Simulation(fleet, sink, clock, random.Random(370), coverage=make_scenario(size))
+
+        started = timeit.default_timer()
+        while sink.frames < count:
+            clock.sleep_until(simulation.tick())
+        elapsed = timeit.default_timer() - started
+
+        record(results, f'tick[{size}]', elapsed * 1e9 / sink.frames, unit='frame',
+               ns_per_tick=round(elapsed * 1e9 / sink.ticks), frames_per_tick=round(sink.frames / sink.ticks, 1),
+               velocity_cache_hits=simulation.cache_stats.hits.get('velocity', 0),
+               velocity_cache_misses=simulation.cache_stats.misses.get('velocity', 0))
+
+def bench_receivers(results, count, receivers=5):
+    """Time ticks fanned out to several receivers spread around the center, per frame simulated"""
+    size = 1000
+    fleet = make_fleet(size)
+    sinks = [NullSink() for _ in range(receivers)]
+    network = flight370.ReceiverNetwork(fleet, [
+        flight370.Receiver(f"rx{i}", flight370.AUGUSTA_LAT + 0.5 * math.cos(i), flight370.AUGUSTA_LON + 0.5 * math.sin(i),
+                           sink, range_nm=40.0)
+        for i, sink in enumerate(sinks)])
+    clock = flight370.VirtualClock()
+    simulation = flight370.Simulation(fleet, network, clock, random.Random(370), coverage=make_scenario(size))
+
+    started = timeit.default_timer()
+    while network.frames < count:
+        clock.sleep_until(simulation.tick())
+    elapsed = timeit.default_timer() - started
+
+    record(results, f'receivers[{receivers}x{size}]', elapsed * 1e9 / network.frames, unit='frame',
+           deliveries_per_frame=round(sum(sink.frames for sink in sinks) / network.frames, 2))
+
+def compare_baseline(results, baseline, tolerance):
+    """Return (name, baseline ns, current ns) for every benchmark slower than baseline by more than tolerance"""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None:
+            continue
+        if result['ns_per_op'] > previous['ns_per_op'] * (1 + tolerance):
+            regressions.append((name, previous['ns_per_op'], result['ns_per_op']))
+    return regressions
+
+def parse_sizes(text):
+    return tuple(int(size) for size in text.split(',') if size)
+
+def main():
+    parser = argparse.ArgumentParser(description='flight370 benchmark suite')
+    parser.add_argument('--frames', type=int, default=20000, help='Frames (or calls) per benchmark (default: 20000)')
+    parser.add_argument('--fleet-sizes', type=parse_sizes, default=FLEET_SIZES,
+                        help='Comma-separated fleet sizes (default: 10,100,1000,10000,100000)')
+    parser.add_argument('--skip-checks', action='store_true', help='Skip the equivalence checks run before timing')
+    parser.add_argument('--json', default=None, help="Write results as JSON to this file ('-' for stdout)")
+    parser.add_argument('--baseline', default=None,
+                        help='JSON results of an earlier run on the same machine to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed slowdown against the baseline before failing (default: 0.2 = 20%%)')
+    args = parser.parse_args()
+
+    if args.json == '-':
+        # Keep stdout clean for the JSON document
+        sys.stdout = sys.stderr
+
+    print(f"Benchmarking with {args.frames} frames, fleet sizes {','.join(map(str, args.fleet_sizes))}")
+    if not args.skip_checks:
+        check_crc(args.frames)
+        check_cpr_nl()
+        check_cpr_batch(args.frames)
+        check_closed_form()
+        check_geodesic(min(args.frames, 5000))
+        check_geodesic_inverse(min(args.frames, 5000))
+        check_motion_models()
+
+    results = {}
+    bench_crc(results, args.frames)
+    bench_cpr(results, args.frames)
+    bench_encoders(results, args.frames)
+    bench_kinematics(results, args.frames, args.fleet_sizes)
+    bench_motion(results, args.fleet_sizes)
+    bench_plans(results, args.fleet_sizes)
+    bench_ticks(results, args.frames, args.fleet_sizes)
+    bench_receivers(results, args.frames)
+
+    report = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'frames': args.frames,
+        'results': results,
+    }
+    if args.json == '-':
+        sys.__stdout__.write(json.dumps(report, indent=2) + "\n")
+    elif args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_baseline(results, baseline, args.tolerance)
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: {before:.1f} -> {after:.1f} ns/op ({after / before - 1:+.0%})")
+        if regressions:
+            sys.exit(f"{len(regressions)} benchmark(s) regressed by more than {args.tolerance:.0%}")
+        print(f"No regressions against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+#!/usr/bin/python3
+
+import csv
+import math
+import mmap
+import random
+import time
+import argparse
+
+import flight370
+import flight370_replay
+
+# Even and odd frames further apart than this are not paired for a global CPR decode
+CPR_MAX_PAIR_AGE = 10.0
+
+# Mean earth radius used for position errors, in metres
+EARTH_RADIUS_M = 6371008.8
+
+def cpr_mod(a, b):
+    """Always-positive modulo, as in dump1090.c"""
+    res = a % b
+    if res < 0:
+        res += b
+    return res
+
+def decode_altitude(field):
+    """
+    Decode a 12-bit AC altitude field to feet, following dump1090.c
+
+    Returns None for Gillham-coded (Q=0) fields, which the generator never sends.
+    """
+    if not field & 0x010:
+        return None
+    n = ((field & 0xFE0) >> 1) | (field & 0x00F)
+    return n * 25 - 1000
+
+def decode_position(frame):
+    """Return (altitude_ft, is_odd, lat_cpr, lon_cpr) of an airborne position frame"""
+    alt_field = (frame[5] << 4) | (frame[6] >> 4)
+    is_odd = bool(frame[6] & 0x04)
+    lat_cpr = ((frame[6] & 0x03) << 15) | (frame[7] << 7) | (frame[8] >> 1)
+    lon_cpr = ((frame[8] & 0x01) << 16) | (frame[9] << 8) | frame[10]
+    return decode_altitude(alt_field), is_odd, lat_cpr, lon_cpr
+
+def decode_cpr_global(even, odd, odd_is_latest):
+    """
+    Globally decode an even/odd CPR pair, as decodeCPRairborne() in dump1090.c
+
+    Args:
+        even: (lat_cpr, lon_cpr) of the even frame
+        odd: (lat_cpr, lon_cpr) of the odd frame
+        odd_is_latest: True if the odd frame was received last
+
+    Returns:
+        (lat, lon) of the latest frame, or None if the pair straddles a zone
+    """
+    lat0, lon0 = even
+    lat1, lon1 = odd
+    dlat0 = flight370.cprDlat(0)
+    dlat1 = flight370.cprDlat(1)
+
+    # Latitude zone index
+    j = math.floor(((59 * lat0 - 60 * lat1) / 131072.0) + 0.5)
+    rlat0 = dlat0 * (cpr_mod(j, 60) + lat0 / 131072.0)
+    rlat1 = dlat1 * (cpr_mod(j, 59) + lat1 / 131072.0)
+    if rlat0 >= 270:
+        rlat0 -= 360
+    if rlat1 >= 270:
+        rlat1 -= 360
+    if not (-90 <= rlat0 <= 90 and -90 <= rlat1 <= 90):
+        return None
+
+    nl = flight370.cprNL(rlat0)
+    if nl != flight370.cprNL(rlat1):
+        return None
+
+    # Longitude zone index, from the latest frame
+    if odd_is_latest:
+        ni = max(nl - 1, 1)
+        m = math.floor((((lon0 * (nl - 1)) - (lon1 * nl)) / 131072.0) + 0.5)
+        rlon = (360.0 / ni) * (cpr_mod(m, ni) + lon1 / 131072.0)
+        rlat = rlat1
+    else:
+        ni = max(nl, 1)
+        m = math.floor((((lon0 * (nl - 1)) - (lon1 * nl)) / 131072.0) + 0.5)
+        rlon = (360.0 / ni) * (cpr_mod(m, ni) + lon0 / 131072.0)
+        rlat = rlat0
+
+    rlon -= math.floor((rlon + 180) / 360) * 360
+    return rlat, rlon
+
+def decode_velocity(frame):
+    """Return (speed_knots, heading, vertical_rate) of a TC 19 subtype 1/2 frame"""
+    ew_raw = ((frame[5] & 0x03) << 8) | frame[6]
+    ns_raw = ((frame[7] & 0x7F) << 3) | (frame[8] >> 5)
+    vr_raw = ((frame[8] & 0x07) << 6) | (frame[9] >> 2)
+    if not ew_raw or not ns_raw:
+        return None
+
+    east_west = ew_raw - 1
+    if frame[5] & 0x04:
+        east_west = -east_west
+    north_south = ns_raw - 1
+    if frame[7] & 0x80:
+        north_south = -north_south
+    if frame[4] & 0x07 == 2:
+        # Supersonic subtype counts in 4-knot units
+        east_west *= 4
+        north_south *= 4
+
+    vertical_rate = None
+    if vr_raw:
+        vertical_rate = (vr_raw - 1) * 64
+        if frame[8] & 0x08:
+            vertical_rate = -vertical_rate
+
+    speed = math.hypot(east_west, north_south)
+    heading = math.degrees(math.atan2(east_west, north_south)) % 360
+    return speed, heading, vertical_rate
+
+def decode_identification(frame):
+    """
+    Return (category, callsign) of a TC 1-4 identification frame; category
+    is the whole type code and emitter category byte, as in
+    flight370.EMITTER_CATEGORIES
+    """
+    bits = int.from_bytes(frame[5:11], 'big')
+    callsign = ''.join(flight370.AIS_CHARSET[(bits >> shift) & 0x3F] for shift in range(42, -1, -6))
+    return frame[4], callsign.strip()
+
+def surface_distance(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in metres"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+class Decoder:
+    """
+    Stateful DF17 decoder: checks CRC, dispatches on type code and keeps the
+    last even and odd position of every aircraft for global CPR decoding
+    """
+    def __init__(self):
+        self._cpr = {}
+        self.counts = {}
+
+    def _count(self, key):
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+    def decode(self, frame, timestamp=None):
+        """
+        Decode one raw frame
+
+        Returns a dict with at least 'icao', 'tc' and 'kind', or None if the
+        CRC fails or the frame is not DF17.
+        """
+        if len(frame) != 14 or frame[0] >> 3 != 17:
+            self._count('not_df17')
+            return None
+        if flight370.crc24_syndrome(frame):
+            self._count('crc_error')
+            return None
+
+        icao = (frame[1] << 16) | (frame[2] << 8) | frame[3]
+        tc = frame[4] >> 3
+        result = {'icao': icao, 'tc': tc}
+
+        if 1 <= tc <= 4:
+            result['kind'] = 'identification'
+            result['category'], result['callsign'] = decode_identification(frame)
+        elif 9 <= tc <= 18 or 20 <= tc <= 22:
+            result['kind'] = 'position'
+            altitude, is_odd, lat_cpr, lon_cpr = decode_position(frame)
+            # TC 20-22 carry GNSS height rather than a barometric AC field
+            result['altitude'] = altitude if tc <= 18 else None
+            result['is_odd'] = is_odd
+            result['position'] = self._decode_cpr(icao, is_odd, lat_cpr, lon_cpr, timestamp)
+        elif tc == 19 and frame[4] & 0x07 in (1, 2):
+            result['kind'] = 'velocity'
+            result['velocity'] = decode_velocity(frame)
+        else:
+            result['kind'] = 'other'
+
+        self._count(result['kind'])
+        return result
+
+    def _decode_cpr(self, icao, is_odd, lat_cpr, lon_cpr, timestamp):
+        """Pair a CPR frame with the latest opposite-parity frame of the same aircraft"""
+        slots = self._cpr.setdefault(icao, [None, None])
+        slots[is_odd] = (lat_cpr, lon_cpr, timestamp)
+        even, odd = slots
+        if even is None or odd is None:
+            return None
+        if timestamp is not None and even[2] is not None and odd[2] is not None:
+            if abs(even[2] - odd[2]) > CPR_MAX_PAIR_AGE:
+                return None
+        return decode_cpr_global(even[:2], odd[:2], is_odd)
+
+class ValidationReport:
+    """Accumulates decode failures and errors against ground truth"""
+    def __init__(self, errors_writer=None):
+        self.frames = 0
+        self.failures = {}
+        self.position_errors = []
+        self.max_altitude_error = 0.0
+        self.max_speed_error = 0.0
+        self.max_heading_error = 0.0
+        self.errors_writer = errors_writer
+
+    def fail(self, reason):
+        self.failures[reason] = self.failures.get(reason, 0) + 1
+
+    def check(self, result, truth, timestamp):
+        """Compare one decoded frame against the aircraft state that produced it"""
+        self.frames += 1
+        if result is None:
+            self.fail('undecodable')
+            return
+
+        error = ''
+        if result['kind'] == 'position':
+            expected_alt = round(truth['alt'] / 25.0) * 25
+            if result['altitude'] is None:
+                self.fail('altitude')
+            else:
+                self.max_altitude_error = max(self.max_altitude_error, abs(result['altitude'] - expected_alt))
+            if result['position'] is not None:
+                lat, lon = result['position']
+                error = surface_distance(lat, lon, truth['lat'], truth['lon'])
+                self.position_errors.append(error)
+        elif result['kind'] == 'velocity':
+            if result['velocity'] is None:
+                self.fail('velocity')
+            else:
+                speed, heading, _ = result['velocity']
+                self.max_speed_error = max(self.max_speed_error, abs(speed - truth['speed']))
+                heading_error = abs((heading - truth['heading'] + 180) % 360 - 180)
+                self.max_heading_error = max(self.max_heading_error, heading_error)
+        elif result['kind'] == 'identification':
+            if (result['callsign'], result['category']) != (truth['callsign'], truth['category']):
+                self.fail('identification')
+
+        if self.errors_writer is not None:
+            self.errors_writer.writerow((f"{timestamp:.6f}", truth['icao'], result['kind'], error))
+
+    def summary(self):
+        """Multi-line report of the validation run"""
+        lines = [f"Validated {self.frames} frames"]
+        errors = sorted(self.position_errors)
+        if errors:
+            p99 = errors[min(len(errors) - 1, int(len(errors) * 0.99))]
+            lines.append(f"Position error over {len(errors)} global decodes: "
+                         f"mean {sum(errors) / len(errors):.1f} m, p99 {p99:.1f} m, max {errors[-1]:.1f} m")
+        lines.append(f"Max altitude error: {self.max_altitude_error:.0f} ft")
+        lines.append(f"Max speed error: {self.max_speed_error:.2f} kts, max heading error: {self.max_heading_error:.2f}°")
+        if self.failures:
+            lines.append("Failures: " + ", ".join(f"{k}={v}" for k, v in sorted(self.failures.items())))
+        else:
+            lines.append("No failures")
+        return "\n".join(lines)
+
+class RoundTripSink(flight370.FrameSink):
+    """
+    Frame sink that decodes every frame as it is written and checks it
+    against the fleet state it was encoded from
+    """
+    def __init__(self, fleet, report, frame_format='avr'):
+        super().__init__(frame_format)
+        self.fleet = fleet
+        self.report = report
+        self.decoder = Decoder()
+
+    def write_frame(self, frame, timestamp):
+        self.frames += 1
+        result = self.decoder.decode(frame, timestamp)
+        icao = (frame[1] << 16) | (frame[2] << 8) | frame[3]
+        index = self.fleet.index_of(icao)
+        if index is None:
+            self.report.fail('unknown_icao')
+            return
+        fleet = self.fleet
+        truth = {
+            'icao': f"{icao:06X}",
+            'lat': float(fleet.lat[index]),
+            'lon': float(fleet.lon[index]),
+            'alt': float(fleet.alt[index]),
+            'speed': float(fleet.speed[index]),
+            'heading': float(fleet.heading[index]),
+            'callsign': fleet.callsign[index].decode('ascii'),
+            'category': int(fleet.category[index]),
+        }
+        self.report.check(result, truth, timestamp)
+
+    def _send(self, data):
+        pass
+
+def record_frame(record, capture_format):
+    """Extract the raw frame bytes from a capture record"""
+    if capture_format == 'beast':
+        return record[2:].replace(b'\x1a\x1a', b'\x1a')[7:]
+    line = record.strip()
+    start = 13 if line.startswith(b'@') else 1
+    return bytes.fromhex(line[start:-1].decode('ascii'))
+
+def decode_capture(path):
+    """Decode every frame of a capture file and return the Decoder with its counts"""
+    decoder = Decoder()
+    with open(path, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        capture_format = flight370_replay.detect_format(data)
+        for ticks, record in flight370_replay.iter_capture(data, capture_format):
+            timestamp = ticks / flight370.BEAST_CLOCK_HZ if ticks is not None else None
+            try:
+                frame = record_frame(record, capture_format)
+            except ValueError:
+                decoder._count('malformed')
+                continue
+            result = decoder.decode(frame, timestamp)
+            if result is not None and result['kind'] == 'position' and result['position'] is None:
+                decoder._count('position_unpaired')
+    finally:
+        data.close()
+    return decoder
+
+def main():
+    parser = argparse.ArgumentParser(description='Decode and validate flight370 ADS-B frames')
+    parser.add_argument('capture', nargs='?', default=None,
+                        help='AVR/Beast capture to decode; without it, validate a fresh simulation round trip')
+    parser.add_argument('--aircraft', type=int, default=100, help='Number of aircraft for the round trip')
+    parser.add_argument('--duration', type=float, default=600.0, help='Simulated seconds for the round trip')
+    parser.add_argument('--seed', type=int, default=None, help='Seed for a repeatable round trip')
+    parser.add_argument('--lat', type=float, default=flight370.AUGUSTA_LAT, help="Center latitude")
+    parser.add_argument('--long', type=float, default=flight370.AUGUSTA_LON, help="Center longitude")
+    parser.add_argument('--errors', default=None, help='Write the per-frame error from ground truth to this CSV file')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.capture:
+        decoder = decode_capture(args.capture)
+        elapsed = time.perf_counter() - started
+        total = sum(decoder.counts.values())
+        print(f"Decoded {args.capture} in {elapsed:.2f}s ({total / elapsed if elapsed else 0:.0f} frames/s)")
+        for key, count in sorted(decoder.counts.items()):
+            print(f"  {key}: {count}")
+        return
+
+    rng = random.Random(args.seed)
+    clock = flight370.VirtualClock()
+    coverage = flight370.Coverage(args.lat, args.long, args.aircraft)
+    fleet = flight370.Fleet(args.aircraft)
+    for _ in range(args.aircraft):
+        fleet.add(flight370.generate_aircraft(coverage, rng, clock.now(), fleet))
+
+    errors_file = open(args.errors, 'w', newline='') if args.errors else None
+    try:
+        writer = None
+        if errors_file is not None:
+            writer = csv.writer(errors_file)
+            writer.writerow(('timestamp', 'icao', 'kind', 'position_error_m'))
+        report = ValidationReport(writer)
+        sink = RoundTripSink(fleet, report)
+        flight370.run_simulation(fleet, sink, clock, clock.now() + args.duration, rng, coverage=coverage)
+    finally:
+        if errors_file is not None:
+            errors_file.close()
+
+    elapsed = time.perf_counter() - started
+    print(report.summary())
+    print(f"Round trip took {elapsed:.2f}s ({report.frames / elapsed if elapsed else 0:.0f} frames/s)")
+
+if __name__ == "__main__":
+    main()
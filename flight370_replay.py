@@ -0,0 +1,173 @@
+#!/usr/bin/python3
+
+import mmap
+import time
+import socket
+import argparse
+
+import flight370
+
+# Unescaped message length for each Beast frame type ('1' Mode A/C, '2' short, '3' long)
+BEAST_MESSAGE_LENGTHS = {0x31: 2, 0x32: 7, 0x33: 14}
+
+# Beast and AVR MLAT timestamps are 48-bit counters
+TIMESTAMP_WRAP = 1 << 48
+
+# Queued bytes that trigger a write even when no sleep is due
+FLUSH_THRESHOLD = 65536
+
+def detect_format(data):
+    """Guess the capture format from its first byte"""
+    first = data[:1]
+    if first == b'\x1a':
+        return 'beast'
+    if first == b'@':
+        return 'avr-mlat'
+    if first == b'*':
+        return 'avr'
+    raise ValueError(f"Unrecognised capture format (first byte {first!r})")
+
+def iter_beast(data):
+    """
+    Yield (ticks, record) for every Beast message in data, where record is
+    the message exactly as captured (still escaped)
+    """
+    end = len(data)
+    pos = data.find(b'\x1a')
+    while 0 <= pos < end - 1:
+        length = BEAST_MESSAGE_LENGTHS.get(data[pos + 1])
+        if length is None:
+            # Not a frame start (escaped 0x1a or unknown type): resync
+            pos = data.find(b'\x1a', pos + 1)
+            continue
+        
+        need = 7 + length
+        start = pos + 2
+        body = data[start:start + need]
+        if len(body) < need:
+            return
+        if b'\x1a' in body:
+            # Slow path: undo 0x1a doubling byte by byte
+            body = bytearray()
+            i = start
+            while len(body) < need and i < end:
+                byte = data[i]
+                if byte == 0x1A:
+                    if i + 1 < end and data[i + 1] == 0x1A:
+                        i += 1
+                    else:
+                        break
+                body.append(byte)
+                i += 1
+            if len(body) < need:
+                # Truncated message: the next frame starts at i
+                pos = i
+                continue
+            next_pos = i
+        else:
+            next_pos = start + need
+        
+        yield int.from_bytes(body[:6], 'big'), data[pos:next_pos]
+        pos = next_pos
+
+def iter_avr(data):
+    """
+    Yield (ticks, record) for every AVR line in data; ticks is None for
+    plain '*HEX;' lines, which carry no timestamp
+    """
+    end = len(data)
+    pos = 0
+    while pos < end:
+        newline = data.find(b'\n', pos)
+        if newline < 0:
+            newline = end
+        line = data[pos:newline].strip()
+        pos = newline + 1
+        
+        if line.startswith(b'@') and len(line) > 13:
+            yield int(line[1:13], 16), line + b'\n'
+        elif line.startswith(b'*'):
+            yield None, line + b'\n'
+
+def iter_capture(data, capture_format):
+    """Yield (ticks, record) for a capture in the given format"""
+    if capture_format == 'beast':
+        return iter_beast(data)
+    return iter_avr(data)
+
+def replay(records, sink, speed=1.0):
+    """
+    Re-emit captured records through sink, keeping their original
+    inter-frame timing scaled by speed (0 for as fast as possible)
+    
+    Records without a timestamp are sent immediately.
+    """
+    first_ticks = None
+    previous = None
+    wrap_offset = 0
+    started = time.monotonic()
+    
+    for ticks, record in records:
+        if speed > 0 and ticks is not None:
+            # Unwrap the 48-bit counter
+            if previous is not None and ticks < previous - TIMESTAMP_WRAP // 2:
+                wrap_offset += TIMESTAMP_WRAP
+            previous = ticks
+            ticks += wrap_offset
+            
+            if first_ticks is None:
+                first_ticks = ticks
+                started = time.monotonic()
+            due = started + (ticks - first_ticks) / flight370.BEAST_CLOCK_HZ / speed
+            delay = due - time.monotonic()
+            if delay > flight370.TICK_INTERVAL:
+                # Everything queued so far is due now; send it before waiting
+                sink.flush()
+                time.sleep(delay)
+        
+        sink.write(record)
+        if sink.pending >= FLUSH_THRESHOLD:
+            sink.flush()
+    
+    sink.flush()
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay an AVR/Beast capture into dump1090 with its original timing')
+    parser.add_argument('capture', help='Capture file written by flight370.py --output or recorded from a receiver')
+    parser.add_argument('--host', default='localhost', help='dump1090 host')
+    parser.add_argument('--port', type=int, default=None, help='dump1090 input port (default: 30001 for AVR, 30004 for Beast)')
+    parser.add_argument('--speed', type=float, default=1.0, help='Replay speed multiplier, 0 for as fast as possible (default: 1)')
+    args = parser.parse_args()
+    
+    with open(args.capture, 'rb') as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            print(f"{args.capture} is empty")
+            return
+    
+    sock = None
+    sink = None
+    try:
+        capture_format = detect_format(data)
+        port = args.port if args.port is not None else flight370.DEFAULT_PORTS[capture_format]
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.connect((args.host, port))
+        print(f"Replaying {args.capture} ({capture_format}, {len(data)} bytes) to {args.host}:{port} "
+              f"at {'full speed' if args.speed <= 0 else f'{args.speed:g}x'}")
+        
+        sink = flight370.SocketSink(sock, capture_format)
+        started = time.perf_counter()
+        replay(iter_capture(data, capture_format), sink, args.speed)
+        print(f"Replay finished in {time.perf_counter() - started:.2f}s")
+    except KeyboardInterrupt:
+        print("\nReplay stopped by user")
+    finally:
+        if sock is not None:
+            sock.close()
+        if sink is not None:
+            print(sink.summary())
+        data.close()
+
+if __name__ == "__main__":
+    main()